@@ -0,0 +1,224 @@
+"""
+ Summary:
+
+    Generates synthetic Flood Modeller DAT files for benchmarking
+
+ Author:
+
+    chyme contributors
+
+ Created:
+
+    17 Oct 2026
+
+"""
+
+import argparse
+import random
+
+class ModelSpec:
+    """The size and shape of a synthetic model.
+
+    The model is a binary tree of reaches, the downstream end of each
+    pair of reaches being joined to the upstream end of the next reach
+    down by an open junction. Each reach is a run of river sections,
+    with an interpolate after every interpolate_spacing'th section and
+    a Muskingham-VPMC unit at its upstream end if it is one of every
+    musk_spacing'th reach.
+
+    Attributes:
+        reach_count: the number of reaches
+        sections_per_reach: the number of river sections in each reach
+        points_per_section: the number of points in each cross-section
+        interpolate_spacing: the number of sections between
+            interpolates, or zero for none
+        musk_spacing: the number of reaches between those that start
+            with a Muskingham-VPMC unit, or zero for none
+        vq_rows: the number of rows in each VQ rating table
+        seed: the seed of the random number generator, so that the same
+            spec always produces the same file
+    """
+    def __init__(self, *,
+                 reach_count = 100,
+                 sections_per_reach = 50,
+                 points_per_section = 20,
+                 interpolate_spacing = 5,
+                 musk_spacing = 10,
+                 vq_rows = 10,
+                 seed = 0):
+        self.reach_count = reach_count
+        self.sections_per_reach = sections_per_reach
+        self.points_per_section = points_per_section
+        self.interpolate_spacing = interpolate_spacing
+        self.musk_spacing = musk_spacing
+        self.vq_rows = vq_rows
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(vars(self))
+
+def generate(spec, *, windows_line_endings = True):
+    """Generate the contents of a DAT file.
+
+    Args:
+        spec: the ModelSpec describing the model
+        windows_line_endings: if True, terminate lines with CR LF, as
+            Flood Modeller does, otherwise with LF
+
+    Returns:
+        The bytes of the file.
+    """
+    rng = random.Random(spec.seed)
+    units = []
+    for reach in range(spec.reach_count):
+        units.extend(_reach_lines(spec, rng, reach))
+    for reach in range(spec.reach_count):
+        upstream = [2 * reach + 1, 2 * reach + 2]
+        upstream = [child for child in upstream if child < spec.reach_count]
+        if upstream:
+            units.append(_junction_lines(
+                [_label(child, 'D') for child in upstream]
+                + [_label(reach, 'U')]))
+
+    unit_count = len(units)
+    lines = _general_lines(unit_count)
+    for unit_lines in units:
+        lines.extend(unit_lines)
+    lines.append('INITIAL CONDITIONS')
+    lines.append('   label   ?      flow     stage froude no  velocity     umode    ustate         z')
+
+    eol = '\r\n' if windows_line_endings else '\n'
+    return (eol.join(lines) + eol).encode('latin_1')
+
+def _label(reach, position):
+    # Node label of a unit in a reach; U and D mark the two ends
+    return 'R{:05d}{}'.format(reach, position if isinstance(position, str)
+                               else '{:03d}'.format(position))
+
+def _general_lines(unit_count):
+    return [
+        'Synthetic benchmark model',
+        '#REVISION#1',
+        '{:10d}{:10.3f}{:10.3f}{:10.3f}{:10.3f}{:10d}{:<10s}'.format(
+            unit_count, 0.75, 0.9, 0.1, 0.001, 12, 'SI'),
+        ('{:10.3f}' * 7).format(10.0, 0.01, 0.01, 0.7, 0.1, 0.7, 0.0),
+        'RAD FILE',
+        '',
+        'END GENERAL',
+    ]
+
+def _reach_lines(spec, rng, reach):
+    # Reach-forming units from upstream to downstream, each as a list
+    # of lines. The chainage of a unit is the distance to the next.
+    units = []
+    labels = []
+    if spec.musk_spacing and reach % spec.musk_spacing == 0:
+        units.append(('musk',))
+    for section in range(spec.sections_per_reach):
+        units.append(('section',))
+        if (spec.interpolate_spacing and section < spec.sections_per_reach - 1
+                and section % spec.interpolate_spacing
+                == spec.interpolate_spacing - 1):
+            units.append(('interpolate',))
+
+    bed = 100.0 - 0.5 * reach
+    result = []
+    for index, (kind,) in enumerate(units):
+        if index == 0:
+            label = _label(reach, 'U')
+        elif index == len(units) - 1:
+            label = _label(reach, 'D')
+        else:
+            label = _label(reach, index)
+        chainage = (0.0 if index == len(units) - 1
+                    else round(rng.uniform(20.0, 200.0), 1))
+        bed -= chainage * 0.001
+        if kind == 'section':
+            result.append(_section_lines(spec, rng, label, chainage, bed))
+        elif kind == 'interpolate':
+            result.append(_interpolate_lines(rng, label, chainage))
+        else:
+            result.append(_musk_lines(spec, rng, label, chainage, bed))
+    return result
+
+def _section_lines(spec, rng, label, chainage, bed):
+    lines = ['RIVER', 'SECTION',
+             '{:<12s}'.format(label),
+             '{:10.3f}{:>10s}{:>10s}{:>10s}'.format(chainage, '', '1000', ''),
+             '{:10d}'.format(spec.points_per_section)]
+    points = spec.points_per_section
+    easting = rng.uniform(400000.0, 500000.0)
+    northing = rng.uniform(200000.0, 300000.0)
+    for point in range(points):
+        # A trapezoidal channel with a little noise on the bed
+        x = point * 2.0
+        depth = min(point, points - 1 - point, 3) * 1.5
+        z = bed + 4.5 - depth + rng.uniform(-0.05, 0.05)
+        if point == 0:
+            marker = 'LEFT'
+        elif point == points - 1:
+            marker = 'RIGHT'
+        elif point == points // 2:
+            marker = 'BED'
+        else:
+            marker = ''
+        lines.append('{:10.3f}{:10.3f}{:10.3f}{:1s}{:9.3f}{:<10s}'
+                     '{:10.2f}{:10.2f}{:<10s}'.format(
+                         x, z, 0.035 if depth else 0.06,
+                         '*' if point == 0 else ' ', 1.0, marker,
+                         easting + x, northing, ''))
+    return lines
+
+def _interpolate_lines(rng, label, chainage):
+    return ['INTERPOLATE',
+            '{:<12s}'.format(label),
+            '{:10.3f}{:10.2f}{:10.2f}'.format(
+                chainage, rng.uniform(400000.0, 500000.0),
+                rng.uniform(200000.0, 300000.0))]
+
+def _musk_lines(spec, rng, label, chainage, bed):
+    lines = ['RIVER', 'MUSK-VPMC',
+             '{:<12s}'.format(label),
+             '{:10.3f}{:10.3f}{:10.5f}{:10.3f}{:10.3f}'.format(
+                 chainage, bed, rng.uniform(0.0005, 0.005), 1.0, 20.0),
+             'WAVESPEED ATTENUATION',
+             '{:10d}'.format(1),
+             '{:10.3f}{:10.3f}{:10.3f}{:10.3f}'.format(
+                 10.0, rng.uniform(0.5, 2.0), 1000.0, 1.0),
+             'VQ RATING',
+             '{:10d}'.format(spec.vq_rows)]
+    for row in range(spec.vq_rows):
+        flow = 5.0 * (row + 1)
+        lines.append('{:10.3f}{:10.3f}'.format(0.3 * (row + 1) ** 0.5, flow))
+    return lines
+
+def _junction_lines(labels):
+    return ['JUNCTION', 'OPEN',
+            ''.join('{:<12s}'.format(label) for label in labels)]
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate a synthetic Flood Modeller DAT file.')
+    parser.add_argument('output', help='path of the DAT file to write')
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    with open(args.output, 'wb') as outfile:
+        outfile.write(generate(spec_from_arguments(args)))
+
+def add_spec_arguments(parser):
+    """Add the options that set the fields of a ModelSpec to an
+    argparse.ArgumentParser.
+    """
+    defaults = ModelSpec()
+    for name, value in defaults.as_dict().items():
+        parser.add_argument('--' + name.replace('_', '-'), type=int,
+                            default=value)
+
+def spec_from_arguments(args):
+    """Create a ModelSpec from the options added by add_spec_arguments().
+    """
+    return ModelSpec(**{name: getattr(args, name)
+                        for name in ModelSpec().as_dict()})
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+ Summary:
+
+    Times the stages of reading, processing and writing a synthetic
+    Flood Modeller DAT file, and reports the results as JSON
+
+ Author:
+
+    chyme contributors
+
+ Created:
+
+    17 Oct 2026
+
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from chyme.flood_modeller import files, network
+
+from . import generate
+
+class StageResult:
+    """The timing and memory use of one stage of a benchmark.
+
+    Attributes:
+        name: the name of the stage
+        seconds: the shortest time taken by the stage over the repeats
+        peak_bytes: the peak memory allocated by Python during the
+            stage, above that allocated before it started, or None if
+            memory was not measured
+        unit_count: the number of units processed by the stage
+        byte_count: the number of bytes of file data processed by the
+            stage
+    """
+    def __init__(self, name, unit_count, byte_count):
+        self.name = name
+        self.seconds = None
+        self.peak_bytes = None
+        self.unit_count = unit_count
+        self.byte_count = byte_count
+
+    def as_dict(self):
+        return {
+            'seconds': self.seconds,
+            'units_per_second': self.unit_count / self.seconds,
+            'mb_per_second': self.byte_count / self.seconds / 1e6,
+            'peak_bytes': self.peak_bytes,
+        }
+
+def stages(filename):
+    """Produce the stages of the benchmark, in order.
+
+    Each stage is a (name, function) tuple. The function takes the
+    object produced by the previous stage and returns the object for
+    the next (the first takes the filename).
+    """
+    # The units created by create_units, from which the network is built
+    created = dict()
+
+    def read(filename):
+        data_file = files.DataFile(filename)
+        data_file.read()
+        return data_file
+
+    def validate(data_file):
+        data_file.validate()
+        return data_file
+
+    def apply(data_file):
+        data_file.apply()
+        return data_file
+
+    def create_units(data_file):
+        created['units'] = data_file.create_units()
+        return data_file
+
+    def write(data_file):
+        data_file.write()
+        return data_file
+
+    def write_modified(data_file):
+        for uio in data_file.units_io:
+            uio.mark_modified()
+        data_file.write()
+        return data_file
+
+    def build_network(data_file):
+        network.FloodModellerNetwork.from_units(created['units'])
+        return data_file
+
+    return [('read', read),
+            ('validate', validate),
+            ('apply', apply),
+            ('create_units', create_units),
+            ('write', write),
+            ('write_modified', write_modified),
+            ('build_network', build_network)]
+
+def run(filename, *, repeat = 3, measure_memory = True):
+    """Run the benchmark on a DAT file.
+
+    The stages are run in sequence, repeat times over, and the shortest
+    time of each is kept. Memory is measured in a further run with
+    tracemalloc, which would otherwise distort the timings.
+
+    Args:
+        filename: the path of the DAT file
+        repeat: the number of times to run the stages
+        measure_memory: if True, measure the peak memory of each stage
+
+    Returns:
+        A list of StageResult objects.
+    """
+    data_file = files.DataFile(filename)
+    data_file.read()
+    unit_count = len(data_file.units_io)
+    byte_count = os.path.getsize(filename)
+    del data_file
+
+    results = {name: StageResult(name, unit_count, byte_count)
+               for name, function in stages(filename)}
+    for i in range(repeat):
+        obj = filename
+        for name, function in stages(filename):
+            gc.collect()
+            start = time.perf_counter()
+            obj = function(obj)
+            seconds = time.perf_counter() - start
+            result = results[name]
+            if result.seconds is None or seconds < result.seconds:
+                result.seconds = seconds
+
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            obj = filename
+            for name, function in stages(filename):
+                gc.collect()
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                obj = function(obj)
+                results[name].peak_bytes = (tracemalloc.get_traced_memory()[1]
+                                            - before)
+        finally:
+            tracemalloc.stop()
+
+    return list(results.values())
+
+def report(spec, results, filename):
+    """Assemble the benchmark results into a dict for output as JSON.
+    """
+    return {
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'spec': spec.as_dict() if spec is not None else None,
+        'file_bytes': os.path.getsize(filename),
+        'unit_count': results[0].unit_count if results else 0,
+        'stages': {result.name: result.as_dict() for result in results},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark reading and writing a Flood Modeller DAT '
+        'file, generating a synthetic one unless a file is given.')
+    parser.add_argument('--dat', help='path of an existing DAT file to use')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip measuring peak memory')
+    parser.add_argument('--output', help='path of the JSON file to write '
+                        '(default: standard output)')
+    generate.add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.dat is None:
+            spec = generate.spec_from_arguments(args)
+            filename = os.path.join(tmp_dir, 'benchmark.dat')
+            with open(filename, 'wb') as outfile:
+                outfile.write(generate.generate(spec))
+        else:
+            spec = None
+            filename = args.dat
+        results = run(filename, repeat=args.repeat,
+                      measure_memory=not args.no_memory)
+        output = report(spec, results, filename)
+
+    if args.output is None:
+        json.dump(output, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.output, 'w') as outfile:
+            json.dump(output, outfile, indent=2)
+
+if __name__ == '__main__':
+    main()
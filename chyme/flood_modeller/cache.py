@@ -0,0 +1,268 @@
+"""
+ Summary:
+
+    Contains functions for caching parsed Flood Modeller (nee ISIS,
+    nee Onda) data files on disk
+
+ Author:
+
+    chyme contributors
+
+ Created:
+
+    17 Oct 2026
+
+"""
+
+import array
+import hashlib
+import inspect
+import os
+import pickle
+import stat
+import struct
+import tempfile
+
+from . import io
+from . import io_data
+
+# Increment whenever the layout of the cached data changes
+CACHE_VERSION = 2
+
+CACHE_MAGIC = b'CHYMECACHE'
+
+# Magic, version, source file size, source file mtime (ns), SHA-256 digest
+# of the source file contents
+_header = struct.Struct('<10sHQq32s')
+
+class CacheUnpickler(pickle.Unpickler):
+    """Unpickler that only creates the objects a cache entry can hold.
+
+    Any global named in a cache file that is not one of the permitted
+    classes (see permitted_classes()) is refused rather than imported.
+    This limits what a tampered cache file can do when loaded, but the
+    cache directory must still be trusted: see is_trusted().
+
+    Attributes:
+        permitted: a dict of the permitted classes and functions, keyed
+            by (module, qualified name)
+    """
+    def __init__(self, cache_file, permitted):
+        super().__init__(cache_file)
+        self.permitted = permitted
+
+    def find_class(self, module, name):
+        obj = self.permitted.get((module, name))
+        if obj is None:
+            raise pickle.UnpicklingError(
+                '%s.%s is not permitted in a cache file' % (module, name))
+        return obj
+
+# The containers of data read from a file, used by every unit type
+_data_classes = (array.array, array._array_reconstructor, io_data.RowData,
+                 io_data.TableData, io_data.Table, io_data.TableRow,
+                 io_data.NumberColumnData, io_data.StringColumnData)
+
+def permitted_classes(data_file):
+    """Find the classes and functions that the cache entry of a data file
+    may hold.
+
+    These are the unit IO classes registered with the data file's
+    unit_registry (and its GeneralIO class), the unit classes they
+    create, and the row, table, field and data classes and conditions
+    of their components, along with the containers of the data.
+
+    Args:
+        data_file: the files.DataFile object
+
+    Returns:
+        A dict of the classes and functions, keyed by (module, qualified
+        name).
+    """
+    permitted = set(_data_classes)
+    unit_ios = [data_file.GeneralIO] if data_file.GeneralIO is not None else []
+    tables = [data_file.unit_registry]
+    while tables:
+        for value in tables.pop().entries.values():
+            if isinstance(value, io.KeywordTable):
+                tables.append(value)
+            else:
+                unit_ios.append(value)
+    for UnitIO in unit_ios:
+        permitted.add(UnitIO)
+        if hasattr(UnitIO, 'UnitClass'):
+            permitted.add(UnitIO.UnitClass)
+        for component in UnitIO.components:
+            _add_component_classes(permitted, component)
+    return {(obj.__module__, obj.__qualname__): obj for obj in permitted}
+
+def _add_component_classes(permitted, component):
+    permitted.add(type(component))
+    condition = getattr(component, 'condition', None)
+    if condition is not None:
+        permitted.add(condition if inspect.isfunction(condition)
+                      else type(condition))
+    row_spec = getattr(component, 'row_spec', None)
+    if row_spec is not None:
+        permitted.add(component.RowType)
+        _add_component_classes(permitted, row_spec)
+    for field in getattr(component, 'fields', ()):
+        permitted.add(type(field))
+        permitted.add(field.FieldDataType)
+
+def is_trusted(cache_dir):
+    """Return whether a cache directory can be trusted.
+
+    Cache entries are pickles, so anyone who can write to the cache
+    directory can affect the objects created by every process that
+    loads from it. Where the platform has file ownership, the directory
+    must belong to the current user and must not be writable by its
+    group or others.
+
+    Args:
+        cache_dir: the directory holding cache files
+
+    Returns:
+        False if the directory is owned by another user, is writable
+        by others or cannot be examined, otherwise True (including if
+        it does not yet exist).
+    """
+    if not hasattr(os, 'getuid'):
+        return True
+    try:
+        dir_stat = os.stat(cache_dir)
+    except FileNotFoundError:
+        return True
+    except OSError:
+        return False
+    return (dir_stat.st_uid == os.getuid()
+            and not dir_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH))
+
+def cache_path(cache_dir, filename):
+    """Return the path of the cache file for a data file.
+
+    Args:
+        cache_dir: the directory holding cache files
+        filename: the path of the data file
+
+    Returns:
+        The path of the cache file, named after a hash of the absolute
+        path of the data file.
+    """
+    key = hashlib.sha256(os.path.abspath(filename).encode('utf-8'))
+    return os.path.join(cache_dir, key.hexdigest() + '.cache')
+
+def content_hash(data):
+    """Return the SHA-256 digest of the contents of a data file.
+
+    Args:
+        data: the bytearray (or mmap) holding the file contents
+    """
+    return hashlib.sha256(data).digest()
+
+def load(cache_dir, data_file):
+    """Load the cached state of a data file.
+
+    The cache entry is only used if it was made from the same contents
+    as the data file now holds. A matching size and modification time
+    is taken as proof of this; if only the size matches, the contents
+    are hashed and compared instead, and if they match the entry's
+    modification time is updated.
+
+    Args:
+        cache_dir: the directory holding cache files
+        data_file: the files.DataFile object to find the state of
+
+    Returns:
+        The dict of cached attributes of the data file, or None if there
+        is no valid cache entry or the cache directory is not trusted.
+    """
+    size, mtime = data_file.file_stat
+    if not is_trusted(cache_dir):
+        return None
+    try:
+        with open(cache_path(cache_dir, data_file.filename), 'rb') as cache_file:
+            header = cache_file.read(_header.size)
+            if len(header) != _header.size:
+                return None
+            magic, version, cached_size, cached_mtime, digest = \
+                _header.unpack(header)
+            if magic != CACHE_MAGIC or version != CACHE_VERSION:
+                return None
+            if cached_size != size:
+                return None
+            if cached_mtime != mtime and digest != content_hash(data_file.data):
+                return None
+            state = CacheUnpickler(cache_file,
+                                   permitted_classes(data_file)).load()
+        if cached_mtime != mtime:
+            # The contents matched, so record the new modification time
+            # to spare later loads from hashing the file again
+            _refresh_header(cache_dir, data_file, digest)
+        return state
+    except OSError:
+        return None
+    except Exception:
+        # A cache written by an incompatible version of the classes it
+        # holds, or holding objects that are not permitted, is treated
+        # as stale
+        return None
+
+def store(cache_dir, data_file, state):
+    """Store the state of a data file in the cache.
+
+    The cache file is written under a temporary name and then moved
+    into place, so that concurrent readers never see a partial file.
+    Failing to write the cache file is not an error: the state is
+    simply not cached. Nothing is written to an untrusted directory.
+
+    Args:
+        cache_dir: the directory holding cache files
+        data_file: the files.DataFile object the state belongs to
+        state: a dict of attributes of the data file to store
+
+    Returns:
+        True if the state was stored.
+    """
+    size, mtime = data_file.file_stat
+    header = _header.pack(CACHE_MAGIC, CACHE_VERSION, size, mtime,
+                          content_hash(data_file.data))
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        if not is_trusted(cache_dir):
+            return False
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, 'wb') as cache_file:
+            cache_file.write(header)
+            pickle.dump(state, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path(cache_dir, data_file.filename))
+    except OSError:
+        _remove(temp_path)
+        return False
+    except BaseException:
+        _remove(temp_path)
+        raise
+    return True
+
+def _refresh_header(cache_dir, data_file, digest):
+    """Rewrite the header of a cache file for the data file's current
+    size and modification time, ignoring any error in doing so.
+    """
+    size, mtime = data_file.file_stat
+    header = _header.pack(CACHE_MAGIC, CACHE_VERSION, size, mtime, digest)
+    try:
+        with open(cache_path(cache_dir, data_file.filename), 'r+b') as cache_file:
+            cache_file.write(header)
+    except OSError:
+        pass
+
+def _remove(path):
+    """Remove a file, ignoring the error if it cannot be removed.
+    """
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
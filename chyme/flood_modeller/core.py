@@ -17,7 +17,16 @@ from .. import d1
 from . import network
 
 class Domain(d1.Domain):
-    def __init__(self, dat_filename, ied_filenames = []):
-        net = network.FloodModellerNetwork(dat_filename, ied_filenames)
+    def __init__(self, dat_filename, ied_filenames = [], **kwargs):
+        """Constructor.
+
+        Args:
+            dat_filename: the path of the DAT file
+            ied_filenames: the paths of the IED files
+            kwargs: further options for loading the files, such as
+                workers, as for network.FloodModellerNetwork
+        """
+        net = network.FloodModellerNetwork(dat_filename, ied_filenames,
+                                           **kwargs)
         super().__init__(net)
 
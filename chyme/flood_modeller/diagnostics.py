@@ -0,0 +1,441 @@
+"""
+ Summary:
+
+    Contains classes for collecting statistics on the loading of Flood
+    Modeller (nee ISIS, nee Onda) files
+
+ Author:
+
+    chyme contributors
+
+ Created:
+
+    17 Oct 2026
+
+"""
+
+import sys
+import time
+import types
+from array import array
+from collections import Counter, defaultdict
+
+from . import io_data
+from . import io_fields
+
+class StageStats:
+    """Count and cumulative time of one stage for one type of unit.
+
+    Attributes:
+        count: the number of units processed
+        seconds: the total time taken, in seconds
+    """
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def add(self, other):
+        self.count += other.count
+        self.seconds += other.seconds
+
+class LoadStats:
+    """Statistics collected while a files.DataFile is loaded.
+
+    Pass a LoadStats object to files.DataFile to collect statistics;
+    nothing is collected otherwise. Units parsed by read(workers=N) in
+    other processes, or lazily by read(lazy=True), are not timed.
+
+    Usage:
+        stats = diagnostics.LoadStats()
+        data_file = files.DataFile(filename, stats=stats)
+        data_file.load()
+        print(stats.summary())
+
+    Attributes:
+        stages: dict, keyed by stage name ('scan', 'read', 'validate',
+            'apply' and 'create_units'), of dicts of StageStats
+            objects keyed by the name of the unit IO class
+        skipped_lines: the number of lines that were skipped because
+            they did not start a recognised unit
+        invalid_units: a Counter of the number of units that failed
+            validation, keyed by the name of the unit IO class
+        invalid_fields: a Counter of the number of invalid values,
+            keyed by (unit IO class name, field name) tuples. Each
+            invalid cell of a table counts separately.
+        unreadable_fields: a Counter, keyed as for invalid_fields, of
+            the number of values that were not blank but could not be
+            converted to their field's type. These are read as None, so
+            only count as invalid if the field does not permit blanks.
+        callback: None, or a function called as callback(stage, uio,
+            seconds) each time a unit completes a stage
+    """
+    stage_names = ('scan', 'read', 'validate', 'apply', 'create_units')
+
+    def __init__(self, callback = None):
+        self.stages = {stage: defaultdict(StageStats)
+                       for stage in self.stage_names}
+        self.skipped_lines = 0
+        self.invalid_units = Counter()
+        self.invalid_fields = Counter()
+        self.unreadable_fields = Counter()
+        self.callback = callback
+
+    def timed(self, stage, uio, function, *args):
+        """Call a function that processes a unit, and record the time
+        it took.
+
+        Args:
+            stage: the name of the stage
+            uio: the FloodModellerUnitIO object being processed
+            function: the function to call
+            args: the arguments to pass to the function
+
+        Returns:
+            The return value of the function.
+        """
+        start = time.perf_counter()
+        result = function(*args)
+        self.record(stage, uio, time.perf_counter() - start)
+        return result
+
+    def record(self, stage, uio, seconds):
+        """Record that a unit has completed a stage.
+
+        Args:
+            stage: the name of the stage
+            uio: the FloodModellerUnitIO object processed
+            seconds: the time taken
+        """
+        unit_type = type(uio).__name__
+        stage_stats = self.stages[stage][unit_type]
+        stage_stats.count += 1
+        stage_stats.seconds += seconds
+        if stage == 'validate':
+            if not uio.is_valid:
+                self.invalid_units[unit_type] += 1
+                for name, count in invalid_fields(uio):
+                    self.invalid_fields[unit_type, name] += count
+            for name, count in unreadable_fields(uio):
+                self.unreadable_fields[unit_type, name] += count
+        if self.callback is not None:
+            self.callback(stage, uio, seconds)
+
+    def record_skipped(self, skipped_lines):
+        """Record the lines skipped while reading a file.
+
+        Args:
+            skipped_lines: the list of indices of the skipped lines
+        """
+        self.skipped_lines += len(skipped_lines)
+
+    def total(self, stage):
+        """Return a StageStats object totalling a stage over all types
+        of unit.
+        """
+        total = StageStats()
+        for stage_stats in self.stages[stage].values():
+            total.add(stage_stats)
+        return total
+
+    def as_dict(self):
+        """Return the statistics as a dict suitable for output as JSON.
+        """
+        return {
+            'stages': {stage: {unit_type: {'count': stage_stats.count,
+                                           'seconds': stage_stats.seconds}
+                               for unit_type, stage_stats
+                               in by_type.items()}
+                       for stage, by_type in self.stages.items()},
+            'skipped_lines': self.skipped_lines,
+            'invalid_units': dict(self.invalid_units),
+            'invalid_fields': {'{}.{}'.format(*key): count for key, count
+                               in self.invalid_fields.items()},
+            'unreadable_fields': {'{}.{}'.format(*key): count for key, count
+                                  in self.unreadable_fields.items()},
+        }
+
+    def summary(self):
+        """Return a table of the statistics as a str, with the unit
+        types taking the most time overall first.
+        """
+        overall = defaultdict(float)
+        for by_type in self.stages.values():
+            for unit_type, stage_stats in by_type.items():
+                overall[unit_type] += stage_stats.seconds
+        unit_types = sorted(overall, key=overall.get, reverse=True)
+
+        lines = ['{:<28s}'.format('unit type') +
+                 ''.join('{:>14s}'.format(stage)
+                         for stage in self.stage_names)]
+        for unit_type in unit_types:
+            cells = []
+            for stage in self.stage_names:
+                stage_stats = self.stages[stage].get(unit_type)
+                cells.append('' if stage_stats is None else
+                             '{:d}/{:.3f}s'.format(stage_stats.count,
+                                                   stage_stats.seconds))
+            lines.append('{:<28s}'.format(unit_type) +
+                         ''.join('{:>14s}'.format(cell) for cell in cells))
+        lines.append('skipped lines: {}'.format(self.skipped_lines))
+        for (unit_type, name), count in self.invalid_fields.most_common():
+            lines.append('invalid {}.{}: {}'.format(unit_type, name, count))
+        for (unit_type, name), count in self.unreadable_fields.most_common():
+            lines.append('unreadable {}.{}: {}'.format(unit_type, name,
+                                                       count))
+        return '\n'.join(lines)
+
+def invalid_fields(uio):
+    """Find the invalid values in a unit that has been validated.
+
+    Args:
+        uio: the FloodModellerUnitIO object
+
+    Yields:
+        (field name, count) tuples, where count is the number of invalid
+        values of the field (more than one for table columns).
+    """
+    for datum in uio.data:
+        if datum.is_valid:
+            continue
+        if isinstance(datum, io_data.TableData):
+            for column in datum.columns:
+                if not column.is_valid:
+                    yield (_field_name(column.field),
+                           len(column.valid) - sum(column.valid))
+        elif isinstance(datum, io_data.RowData):
+            for field_data in datum.row_data:
+                if not field_data.is_valid:
+                    yield _field_name(field_data.field), 1
+        else:
+            yield _field_name(datum.field), 1
+
+def unreadable_fields(uio):
+    """Find the values in a unit that were not blank but could not be
+    converted to their field's type.
+
+    Args:
+        uio: the FloodModellerUnitIO object
+
+    Yields:
+        (field name, count) tuples, for each field with at least one
+        such value.
+    """
+    for datum in uio.data:
+        if isinstance(datum, io_data.TableData):
+            for column in datum.columns:
+                if column.is_none != column.is_blank:
+                    yield (_field_name(column.field),
+                           sum(none and not blank for none, blank
+                               in zip(column.is_none, column.is_blank)))
+        elif isinstance(datum, io_data.RowData):
+            for field_data in datum.row_data:
+                if _is_unreadable(field_data):
+                    yield _field_name(field_data.field), 1
+        elif _is_unreadable(datum):
+            yield _field_name(datum.field), 1
+
+def _is_unreadable(field_data):
+    # Numbers that fail to convert keep their text but have no value
+    return (isinstance(field_data, (io_data.IntegerData, io_data.FloatData))
+            and field_data.value_str is not None and field_data.value is None)
+
+def _field_name(field):
+    # Keywords have no attribute name, so are named after the keyword
+    if field.attribute_name is not None:
+        return field.attribute_name
+    return str(getattr(field, 'keyword', b''), 'latin_1')
+
+class MemoryReport:
+    """The memory retained by a loaded files.DataFile, by category and
+    type of unit.
+
+    Each object is counted once, in the first category in which it is
+    found, in the order of categories below. A value that is shared
+    between a FieldData object, the attribute applied to a unit IO
+    object and a unit object is therefore counted under field_data,
+    and only the extra references to it count towards the others.
+    Definitions shared by every file (the DataField, DataRow and
+    DataTable objects and the classes) are not counted.
+
+    Attributes:
+        bytes: dict, keyed by category, of Counters of the number of
+            bytes, keyed by class name. The categories are:
+            'file': the contents of the file and its line index
+            'field_data': the io_data.FieldData objects
+            'containers': the io_data.RowData, TableData and ColumnData
+                objects, including the arrays of table values
+            'io': the unit IO objects, including their applied
+                attributes, keyed by unit IO class
+            'units': the units.FloodModellerUnit objects, keyed by unit
+                class
+        counts: a Counter of the number of objects of each unit IO or
+            unit class
+    """
+    categories = ('file', 'field_data', 'containers', 'io', 'units')
+
+    def __init__(self):
+        self.bytes = {category: Counter() for category in self.categories}
+        self.counts = Counter()
+
+    def total(self, category = None):
+        """Return the total number of bytes in a category, or in all
+        categories if category is None.
+        """
+        if category is None:
+            return sum(self.total(category) for category in self.categories)
+        return sum(self.bytes[category].values())
+
+    def as_dict(self):
+        """Return the report as a dict suitable for output as JSON.
+        """
+        return {
+            'bytes': {category: dict(by_type)
+                      for category, by_type in self.bytes.items()},
+            'counts': dict(self.counts),
+            'total': self.total(),
+        }
+
+    def summary(self):
+        """Return a table of the report as a str, with the types
+        retaining the most memory first.
+        """
+        overall = Counter()
+        for by_type in self.bytes.values():
+            overall.update(by_type)
+        lines = ['{:<28s}{:>8s}'.format('type', 'count') +
+                 ''.join('{:>12s}'.format(category)
+                         for category in self.categories)]
+        for name, total in overall.most_common():
+            lines.append('{:<28s}{:>8d}'.format(name, self.counts[name]) +
+                         ''.join('{:>12d}'.format(self.bytes[category][name])
+                                 for category in self.categories))
+        lines.append('{:<28s}{:>8s}'.format('total', '') +
+                     ''.join('{:>12d}'.format(self.total(category))
+                             for category in self.categories))
+        return '\n'.join(lines)
+
+def memory_report(data_file, unit_list = None):
+    """Measure the memory retained by a loaded files.DataFile.
+
+    Every object is visited, so this takes about as long as loading the
+    file did.
+
+    Args:
+        data_file: the DataFile, after reading and (optionally)
+            validating and applying its units. Only the units that have
+            been parsed are measured if it was read lazily.
+        unit_list: the list of FloodModellerUnit objects created from
+            the file, or None to measure the units that
+            files.DataFile.create_units() would create (in which case
+            the units must have been applied)
+
+    Returns:
+        A MemoryReport object.
+    """
+    report = MemoryReport()
+    seen = set()
+
+    units_io = data_file.units_io
+    if hasattr(units_io, 'is_parsed'):
+        # A files.LazyUnitList; measuring the other units would parse them
+        units_io = [units_io[i] for i in range(len(units_io))
+                    if units_io.is_parsed(i)]
+    if unit_list is None:
+        unit_list = [uio.create_unit() for uio in units_io if uio.is_valid]
+    units_io = list(units_io)
+    if data_file.general is not None:
+        units_io.insert(0, data_file.general)
+
+    report.bytes['file']['DataFile'] = _deep_size(
+        [data_file.data, data_file.line_starts], seen)
+
+    # FieldData and containers are found by walking each unit's data,
+    # stopping at the objects of the other categories
+    for uio in units_io:
+        name = type(uio).__name__
+        report.counts[name] += 1
+        for datum in uio.data:
+            for field_data in _field_data(datum):
+                report.bytes['field_data'][name] += _deep_size(
+                    field_data, seen)
+    for uio in units_io:
+        name = type(uio).__name__
+        report.bytes['containers'][name] += _deep_size(uio.data, seen)
+    for uio in units_io:
+        report.bytes['io'][type(uio).__name__] += _deep_size(uio, seen)
+    for unit in unit_list:
+        name = type(unit).__name__
+        report.counts[name] += 1
+        report.bytes['units'][name] += _deep_size(unit, seen)
+    return report
+
+def _field_data(datum):
+    # The FieldData objects within an item of a unit's data
+    if isinstance(datum, io_data.RowData):
+        return datum.row_data
+    if isinstance(datum, io_data.FieldData):
+        return [datum]
+    return []
+
+# Objects that are shared by every file, and so not counted
+_shared_types = (type, types.ModuleType, types.FunctionType,
+                 types.BuiltinFunctionType, types.MethodType,
+                 io_fields.DataField, io_fields.DataRow, io_fields.DataTable,
+                 bool, type(None))
+
+def _deep_size(obj, seen):
+    """Total the size of an object and everything it refers to that has
+    not already been counted.
+
+    Args:
+        obj: the object to measure
+        seen: the set of the ids of objects already counted, to which
+            the objects counted here are added
+
+    Returns:
+        The number of bytes.
+    """
+    getsizeof = sys.getsizeof
+    total = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        obj_id = id(obj)
+        if obj_id in seen:
+            continue
+        obj_type = type(obj)
+        if obj_type in _leaf_types:
+            seen.add(obj_id)
+            total += getsizeof(obj)
+            continue
+        if isinstance(obj, _shared_types):
+            continue
+        seen.add(obj_id)
+        total += getsizeof(obj)
+        if obj_type is dict:
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        else:
+            if hasattr(obj, '__dict__'):
+                stack.append(obj.__dict__)
+            for name in _slot_names(obj_type):
+                value = getattr(obj, name, None)
+                if value is not None:
+                    stack.append(value)
+    return total
+
+def _slot_names(cls):
+    # The names of the slots declared by a class and its bases
+    names = _slot_name_cache.get(cls)
+    if names is None:
+        names = [name for klass in cls.__mro__
+                 for name in klass.__dict__.get('__slots__', ())]
+        _slot_name_cache[cls] = names
+    return names
+
+_slot_name_cache = {}
+
+# Types of objects that refer to no others that need counting
+_leaf_types = {str, bytes, bytearray, int, float, array, memoryview}
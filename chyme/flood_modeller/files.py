@@ -14,104 +14,873 @@
 
 """
 
+import gc
+import mmap
+import os
+import threading
+from array import array
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import accumulate, repeat
+
+from . import cache
+from . import diagnostics
 from . import units
 from . import io
 
 class DataFile:
-    valid_units = [
+    # Maps the keywords that start each unit to the unit IO classes
+    unit_registry = io.unit_registry
+
+    # Retained for code that adds unit IO classes to it, each of which is
+    # registered with unit_registry. New code should use
+    # io.register_unit() instead. A subclass that defines its own
+    # valid_units list gets a registry of just those classes.
+    valid_units = io.RegisteringList(io.unit_registry, [
         io.InterpolateUnitIO,
         io.RiverUnitGroupIO,
         io.JunctionUnitGroupIO,
-    ]
+        io.FlowTimeBoundaryUnitIO,
+        io.HeadTimeBoundaryUnitIO,
+        io.FlowHeadBoundaryUnitIO,
+    ])
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'valid_units' in cls.__dict__ and 'unit_registry' not in cls.__dict__:
+            cls.unit_registry = io.UnitRegistry()
+            cls.valid_units = io.RegisteringList(cls.unit_registry,
+                                                 cls.valid_units)
+
+    # The class of the general header at the start of the file, or None
+    # if the file has no header
+    GeneralIO = io.GeneralUnitIO
+
+    # Bytes of the file examined at a time while building the line index
+    index_chunk_size = 1 << 20
+
+    # Bytes of output collected before each write to a stream
+    write_buffer_size = 1 << 20
     
-    def __init__(self, filename):
-        with open(filename, 'rb', buffering=0) as infile:
-            self.data = bytearray(infile.readall())
-
-    def read(self):
-        line_iter = self.lines()
-        next_line = next(line_iter)
-        self.general = io.GeneralUnitIO(next_line)
-        self.general.read(line_iter)
-
-        self.units_io = []
-        next_line = next(line_iter)
-        while next_line.removeprefix(b'INITIAL CONDITIONS') == next_line:
-            line_valid = False
-            for UnitIO in self.valid_units:
-                if next_line.removeprefix(UnitIO.unit_name) != next_line:
-                    line_valid = True
-                    if issubclass(UnitIO, io.FloodModellerUnitGroupIO):
-                        second_line = next(line_iter)
-                        #print("Second line: {}".format(second_line))
-                        for SubUnitIO in UnitIO.subunits:
-                            if second_line.removeprefix(SubUnitIO.subunit_name) != second_line:
-                                self.units_io.append(SubUnitIO(next_line, second_line))
-                                self.units_io[-1].read(line_iter)
-                                #print(self.units[-1])
-                                break
-                    else:
-                        self.units_io.append(UnitIO(next_line))
-                        self.units_io[-1].read(line_iter)
-                        #print(self.units[-1])
-                    break
-
-            if not line_valid:
-                print("Skipping line: {}".format(next_line))
-            next_line = next(line_iter)
+    def __init__(self, filename, *, use_mmap = False, stats = None):
+        """Constructor.
+
+        Args:
+            filename: the path of the DAT file to read
+            use_mmap: if True, memory-map the file rather than reading it
+                into memory. Lines are then produced as memoryview
+                slices into the mapping rather than copies, so the
+                file is never held in memory more than once. The
+                mapping stays open until close() is called.
+            stats: if not None, a diagnostics.LoadStats object in which
+                to record counts and timings of each stage of loading
+        """
+        self.filename = filename
+        self.use_mmap = use_mmap
+        self.stats = stats
+        if use_mmap:
+            with open(filename, 'rb') as infile:
+                stat = os.fstat(infile.fileno())
+                self.data = mmap.mmap(infile.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+            self.view = memoryview(self.data)
+        else:
+            with open(filename, 'rb', buffering=0) as infile:
+                stat = os.fstat(infile.fileno())
+                self.data = bytearray(infile.readall())
+            self.view = self.data
+        self.file_stat = (stat.st_size, stat.st_mtime_ns)
+        self.line_starts = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the memory mapping, if the file was memory-mapped.
+
+        Any memoryview lines produced by lines() must have been
+        released before the mapping can be closed.
+        """
+        if self.use_mmap and not self.data.closed:
+            self.view.release()
+            self.data.close()
+
+    # Number of chunks per worker that units are split into when parsing
+    # in parallel, to even out the load between workers
+    chunks_per_worker = 4
+
+    def read(self, *, lazy = False, workers = None):
+        """Read the general header and the units from the file.
+
+        Args:
+            lazy: if True, only scan the file for unit boundaries and
+                defer parsing each unit until it is first accessed
+                through units_io.
+            workers: if greater than one, scan the file for unit
+                boundaries and then parse the units in chunks across a
+                pool of this many processes. Ignored if lazy is True.
+        """
+        line_iter = self.read_general()
+        if lazy:
+            self.units_io = LazyUnitList(self, self.scan(line_iter))
+            return
+        if workers is not None and workers > 1:
+            self.units_io = self.read_parallel(self.scan(line_iter), workers)
+        else:
+            self.units_io = list(self.read_units(line_iter))
+
+    def read_parallel(self, spans, workers):
+        """Parse units in parallel across a pool of processes.
+
+        Each process re-opens the file (memory-mapped, so that the pages
+        are shared through the operating system's cache) and parses a
+        contiguous chunk of the units.
+
+        Args:
+            spans: the list of UnitSpan objects found by scan()
+            workers: the number of processes to use
+
+        Returns:
+            The list of FloodModellerUnitIO objects, read but not
+            validated, in the same order as spans.
+        """
+        chunk_count = min(len(spans), workers * self.chunks_per_worker)
+        if chunk_count == 0:
+            return []
+        chunk_size = -(-len(spans) // chunk_count)
+        chunks = [spans[i:i + chunk_size]
+                  for i in range(0, len(spans), chunk_size)]
+        units_io = []
+        # The collector is paused while the results are unpickled, which
+        # otherwise triggers repeated full collections
+        with ProcessPoolExecutor(max_workers=workers) as executor, \
+                gc_paused():
+            for chunk_units_io in executor.map(
+                    _parse_spans, repeat(self.filename), chunks):
+                units_io.extend(chunk_units_io)
+        return units_io
+
+    def iter_units(self, *, create_units = False):
+        """Read the file one unit at a time.
+
+        Each unit is read, validated and, if valid, applied before it is
+        produced. The units are not retained by the DataFile, so memory
+        use does not grow with the size of the model.
+
+        Args:
+            create_units: if True, produce the FloodModellerUnit object
+                created from each valid unit (invalid units are skipped,
+                as in create_units()) rather than the unit IO object.
+
+        Yields:
+            Each FloodModellerUnitIO object, or FloodModellerUnit object
+            if create_units is True, in file order.
+        """
+        stats = self.stats
+        for uio in self.read_units(self.read_general()):
+            if stats is None:
+                if uio.validate():
+                    uio.apply()
+            elif stats.timed('validate', uio, uio.validate):
+                stats.timed('apply', uio, uio.apply)
+            if not create_units:
+                yield uio
+            elif uio.is_valid:
+                if stats is None:
+                    yield uio.create_unit()
+                else:
+                    yield stats.timed('create_units', uio, uio.create_unit)
+
+    def read_general(self):
+        """Read the general header at the start of the file.
+
+        Returns:
+            A LineCursor positioned after the header.
+
+        Raises:
+            RuntimeError: if the file has no lines, or ends within the
+                header
+        """
+        if self.line_count() == 0:
+            raise RuntimeError("No lines in flood modeller file.")
+        line_iter = LineCursor(self)
+        if self.GeneralIO is None:
+            self.general = None
+            return line_iter
+        try:
+            self.general = self.GeneralIO(next(line_iter))
+            self.general.read(line_iter)
+        except StopIteration:
+            raise RuntimeError("Flood modeller file ends within the "
+                               "general header.") from None
+        self.general.line_range = (0, line_iter.index)
+        return line_iter
+
+    def read_units(self, line_iter):
+        """Read units from the file.
+
+        Args:
+            line_iter: a LineCursor positioned after the general header
+
+        Yields:
+            Each FloodModellerUnitIO object, read but not validated.
+        """
+        stats = self.stats
+        for UnitIO, first_line, second_line, start in self.unit_headers(line_iter):
+            if second_line is None:
+                uio = UnitIO(first_line)
+            else:
+                uio = UnitIO(first_line, second_line)
+            if stats is None:
+                uio.read(line_iter)
+            else:
+                stats.timed('read', uio, uio.read, line_iter)
+            uio.line_range = (start, line_iter.index)
+            yield uio
+        if stats is not None:
+            stats.record_skipped(self.skipped_lines)
+
+    def scan(self, line_iter = None):
+        """Scan the file for unit boundaries without fully parsing units.
+
+        Args:
+            line_iter: a LineCursor positioned after the general header.
+                If None, the header is skipped first.
+
+        Returns:
+            A list of UnitSpan objects, one per unit in the file.
+        """
+        if line_iter is None:
+            line_iter = LineCursor(self)
+            if self.GeneralIO is not None:
+                general = self.GeneralIO(next(line_iter))
+                general.scan(line_iter)
+
+        stats = self.stats
+        spans = []
+        for UnitIO, first_line, second_line, start in self.unit_headers(line_iter):
+            if second_line is None:
+                uio = UnitIO(first_line)
+            else:
+                uio = UnitIO(first_line, second_line)
+            if stats is None:
+                uio.scan(line_iter)
+            else:
+                stats.timed('scan', uio, uio.scan, line_iter)
+            spans.append(UnitSpan(UnitIO, start, line_iter.index,
+                                  uio.node_labels,
+                                  header_lines=(1 if second_line is None else 2)))
+        if stats is not None:
+            stats.record_skipped(self.skipped_lines)
+        return spans
+
+    def unit_headers(self, line_iter):
+        """Find the keyword line(s) at the start of each unit.
+
+        The caller is expected to consume the body of each unit from
+        line_iter before requesting the next header. Lines that do not
+        start a recognised unit are skipped, and their indices recorded
+        in self.skipped_lines. The search finishes at the INITIAL
+        CONDITIONS keyword or the end of the file, the index of which
+        is recorded in self.tail_start.
+
+        Args:
+            line_iter: a LineCursor positioned after the general header
+
+        Yields:
+            (UnitIO, first_line, second_line, start) tuples, where
+            UnitIO is the class of the unit, second_line is None for
+            units without a sub-unit keyword and start is the index of
+            the unit's first line.
+        """
+        self.skipped_lines = []
+        while True:
+            start = line_iter.index
+            self.tail_start = start
+            try:
+                next_line = next(line_iter)
+            except StopIteration:
+                return
+            if io.startswith(next_line, b'INITIAL CONDITIONS'):
+                return
+
+            UnitIO = self.unit_registry.match(next_line)
+            if isinstance(UnitIO, io.KeywordTable):
+                try:
+                    second_line = next(line_iter)
+                except StopIteration:
+                    self.skipped_lines.append(start)
+                    self.tail_start = line_iter.index
+                    return
+                SubUnitIO = UnitIO.match(second_line)
+                if SubUnitIO is None:
+                    self.skipped_lines.extend((start, start + 1))
+                else:
+                    yield SubUnitIO, next_line, second_line, start
+            elif UnitIO is None:
+                self.skipped_lines.append(start)
+            else:
+                yield UnitIO, next_line, None, start
+
+    # Attributes saved in, and restored from, the cache by load()
+    cached_attributes = ('general', 'units_io', 'skipped_lines', 'tail_start',
+                         'is_valid')
+
+    def load(self, *, cache_dir = None, workers = None):
+        """Read, validate and apply the file.
+
+        As for apply(), only the units that are valid are applied.
+
+        Args:
+            cache_dir: if not None, the directory of a cache of parsed
+                files. If the cache holds an entry made from the same
+                file contents, the parsed and validated units are loaded
+                from it instead of being read. Otherwise the entry is
+                (re)built once the file has been read, if the cache can
+                be written. Cache entries are pickles, so the directory
+                must be trusted; it is ignored if it belongs to another
+                user or others can write to it (see cache.is_trusted()).
+            workers: as for read()
+
+        Returns:
+            True if the file is valid.
+        """
+        if cache_dir is not None:
+            with gc_paused():
+                state = cache.load(cache_dir, self)
+            if state is not None:
+                self.__dict__.update(state)
+                return self.is_valid
+
+        self.read(workers=workers)
+        self.validate()
+        self.apply()
+
+        if cache_dir is not None:
+            with gc_paused():
+                cache.store(cache_dir, self,
+                            {name: getattr(self, name)
+                             for name in self.cached_attributes})
+        return self.is_valid
 
     def validate(self):
+        stats = self.stats
         for uio in self.units_io:
-            uio.validate()
+            if stats is None:
+                uio.validate()
+            else:
+                stats.timed('validate', uio, uio.validate)
         self.is_valid = all(self.units_io)
         return self.is_valid
             
     def apply(self):
+        stats = self.stats
         for uio in self.units_io:
             if uio.is_valid:
-                uio.apply()
+                if stats is None:
+                    uio.apply()
+                else:
+                    stats.timed('apply', uio, uio.apply)
 
     def create_units(self):
+        stats = self.stats
         units = []
         for uio in self.units_io:
             if uio.is_valid:
-                units.append(uio.create_unit())
+                if stats is None:
+                    units.append(uio.create_unit())
+                else:
+                    units.append(stats.timed('create_units', uio,
+                                             uio.create_unit))
         return units
         
                 
+    def memory_report(self, unit_list = None):
+        """Measure the memory retained by the file's data and units.
+
+        Args:
+            unit_list: as for diagnostics.memory_report()
+
+        Returns:
+            A diagnostics.MemoryReport object.
+        """
+        return diagnostics.memory_report(self, unit_list)
+
     def write(self, filename = None):
+        """Write the file.
+
+        Units that have not been modified since they were read are
+        copied byte for byte from the original file, as are lines that
+        were skipped while reading and everything from the INITIAL
+        CONDITIONS keyword onwards. Only modified units, and units that
+        were not read from the file, are formatted afresh. An unmodified
+        file is therefore written out identically.
+
+        Args:
+            filename: the path of the file to write, or None to return
+                the data instead
+
+        Returns:
+            A bytearray containing the data if filename is None,
+            otherwise None. The file is streamed to disk rather than
+            being assembled in memory first.
+        """
+        if filename is None:
+            out_data = bytearray()
+            for block in self.output_blocks():
+                out_data += block
+            return out_data
+        with open(filename, 'wb') as out_file:
+            self.write_to(out_file)
+
+    def write_to(self, stream, *, buffer_size = None):
+        """Write the file to a binary file-like object.
+
+        The data is streamed a unit at a time through a bounded buffer,
+        so memory use does not grow with the size of the model. Large
+        blocks copied from the original file bypass the buffer.
+
+        Args:
+            stream: an object with a write() method accepting bytes-like
+                objects, e.g. a file opened in binary mode, a pipe or a
+                gzip.open() handle
+            buffer_size: the number of bytes to collect before each
+                write to the stream, or None for write_buffer_size
+        """
+        if buffer_size is None:
+            buffer_size = self.write_buffer_size
+        buffer = bytearray()
+        for block in self.output_blocks():
+            if len(block) >= buffer_size:
+                if len(buffer) > 0:
+                    stream.write(buffer)
+                    buffer.clear()
+                stream.write(block)
+            else:
+                buffer += block
+                if len(buffer) >= buffer_size:
+                    stream.write(buffer)
+                    buffer.clear()
+        if len(buffer) > 0:
+            stream.write(buffer)
+
+    def output_blocks(self):
+        """Produce the data of the file for writing, a block at a time.
+
+        Yields:
+            bytes-like objects that together make up the file, as
+            described for write().
+        """
+        unterminated = False
+        for block in self.file_blocks():
+            if len(block) == 0:
+                continue
+            if unterminated:
+                # The final line of the original file had no terminator,
+                # but more data now follows it
+                yield b'\r\n' if self.windows_line_endings else b'\n'
+            yield block
+            unterminated = block[-1] != ord('\n')
+
+    def file_blocks(self):
+        """Produce the blocks of data that make up the file, as for
+        output_blocks(), but without adding a terminator to the final
+        line of the original file if it has none.
+        """
+        line_count = self.line_count()
+        skipped = set(self.skipped_lines)
+        position = 0
+        for unit, line_range in self.units_for_output():
+            if line_range is not None and line_range[0] >= position:
+                # Lines skipped while reading, between units
+                for i in range(position, line_range[0]):
+                    if i in skipped:
+                        yield self.raw_lines(i, i + 1)
+                position = line_range[1]
+            if line_range is not None and (unit is None or not unit.modified()):
+                yield self.raw_lines(*line_range)
+            else:
+                yield self.format_unit(unit)
+        for i in range(position, self.tail_start):
+            if i in skipped:
+                yield self.raw_lines(i, i + 1)
+        if self.tail_start < line_count:
+            yield self.raw_lines(self.tail_start, line_count)
+
+    def units_for_output(self):
+        """Produce the general header and units in the order they are to
+        be written.
+
+        Yields:
+            (unit, line_range) tuples, where unit is the unit IO object,
+            or None for a lazily read unit that has not been parsed, and
+            line_range is the (start, stop) indices of the lines it was
+            read from, or None.
+        """
+        if self.general is not None:
+            yield self.general, self.general.line_range
+        if isinstance(self.units_io, LazyUnitList):
+            for index, span in enumerate(self.units_io.spans):
+                if self.units_io.is_parsed(index):
+                    yield self.units_io[index], (span.start, span.stop)
+                else:
+                    yield None, (span.start, span.stop)
+        else:
+            for unit in self.units_io:
+                yield unit, unit.line_range
+
+    def raw_lines(self, start, stop):
+        """Return lines exactly as they appear in the file, including
+        their terminators.
+
+        The final line of the file is returned without a terminator if
+        it does not have one; output_blocks() adds one only if more data
+        follows it.
+        """
+        return self.view[self.line_starts[start]:
+                         min(self.line_starts[stop], len(self.data))]
+
+    def format_unit(self, unit):
+        """Format a unit afresh, using the line terminators of the file.
+        """
         out_data = bytearray()
-        self.general.write(out_data)
-        for unit in self.units_io:
-            unit.write(out_data)
-        if filename is not None:
-            with open(filename, 'wb') as out_file:
-                out_file.write(out_data)
+        unit.write(out_data)
+        if self.windows_line_endings:
+            out_data = out_data.replace(b'\n', b'\r\n')
         return out_data
         
-    def lines(self):
-        index = 0
-        line_end = self.data.find(b'\n')
-        if line_end == -1:
-            raise RuntimeError("No newlines in flood modeller file.")
-        if line_end == 0:
-            self.windows_line_endings = True
-        else:
-            if self.data[line_end - 1] == '\r':
-                self.windows_line_endings = True
-            else:
-                self.windows_line_endings = False
-        self.wle_offset = 1
-        if self.windows_line_endings:
-            self.wle_offset = 2
-            
-        while index < len(self.data):
-            yield self.data[index:line_end - self.wle_offset]
-            index = line_end + 1
-            line_end = self.data.find(b'\n', index)
+    def build_line_index(self):
+        """Build the index of line start offsets.
+
+        The file is split in a single bulk pass, a chunk at a time so
+        that memory-mapped files are never copied in full. The index
+        holds the offset of the start of every line, followed by a
+        sentinel that is one past the newline terminating the final
+        line (whether or not the file actually ends with a newline).
+        """
+        size = len(self.data)
+        starts = array('Q', [0])
+        for chunk_start in range(0, size, self.index_chunk_size):
+            chunk = self.data[chunk_start:chunk_start + self.index_chunk_size]
+            # Every piece but the last is terminated by a newline
+            pieces = chunk.split(b'\n')
+            offsets = accumulate((len(p) + 1 for p in pieces[:-1]),
+                                 initial=chunk_start)
+            next(offsets)
+            starts.extend(offsets)
+        if size > 0 and starts[-1] != size:
+            starts.append(size + 1)
+        self.line_starts = starts
+
+        self.windows_line_endings = False
+        if self.line_count() > 0:
+            line_end = self.line_starts[1] - 1
+            self.windows_line_endings = (
+                line_end > 0 and self.data[line_end - 1] == ord('\r'))
+
+    def line_count(self):
+        """Return the number of lines in the file.
+        """
+        if self.line_starts is None:
+            self.build_line_index()
+        return len(self.line_starts) - 1
+
+    def line_bounds(self, i):
+        """Return the byte range occupied by a line.
+
+        Args:
+            i: the index of the line
+
+        Returns:
+            A (start, end) tuple of offsets into the file data, excluding
+            the line terminator. Both LF and CR/LF terminators are
+            recognised, and they may be mixed within a file.
+        """
+        count = self.line_count()
+        if i < 0:
+            i += count
+        if i < 0 or i >= count:
+            raise IndexError("Line index out of range")
+        start = self.line_starts[i]
+        end = self.line_starts[i + 1] - 1
+        if end > start and self.data[end - 1] == ord('\r'):
+            end -= 1
+        return start, end
+
+    def line(self, i):
+        """Return a single line from the file.
+
+        Args:
+            i: the index of the line
+
+        Returns:
+            The line, excluding its terminator, as a bytearray (or as a
+            memoryview if the file is memory-mapped).
+        """
+        start, end = self.line_bounds(i)
+        return self.view[start:end]
+
+    def line_range(self, i, j):
+        """Return a contiguous block of lines from the file.
+
+        Args:
+            i: the index of the first line in the block
+            j: the index one past the last line in the block
+
+        Returns:
+            The raw data of lines i to j - 1, including the terminators
+            between them but not the terminator of the final line.
+        """
+        if j <= i:
+            return self.view[0:0]
+        start = self.line_bounds(i)[0]
+        end = self.line_bounds(j - 1)[1]
+        return self.view[start:end]
+
+    def lines(self, start = 0, stop = None):
+        """Iterate over lines from the file.
+
+        Args:
+            start: the index of the first line to produce
+            stop: the index one past the last line to produce, or None
+                to continue to the end of the file
+
+        Yields:
+            Each line, as for line().
+        """
+        count = self.line_count()
+        if stop is None or stop > count:
+            stop = count
+        starts = self.line_starts
+        data = self.data
+        view = self.view
+        cr = ord('\r')
+        for i in range(start, stop):
+            line_start = starts[i]
+            line_end = starts[i + 1] - 1
+            if line_end > line_start and data[line_end - 1] == cr:
+                line_end -= 1
+            yield view[line_start:line_end]
 
     def get_domain(self):
         # 1. Read the file into an array of Unit objects
         # 2. Validate the units and, where possible, create Structure objects
         # 3. Build the 1D Network and domain
         pass
+
+# Number of gc_paused() contexts currently entered by the main thread, and
+# whether the collector was enabled before the first was entered
+_gc_pause_count = 0
+_gc_was_enabled = False
+
+class EventFile(DataFile):
+    """An IED (event data) file.
+
+    An IED file holds boundary units in the same format as a DAT file,
+    but without the general header. Lines before the first unit, such
+    as a title, are skipped and written back unchanged.
+    """
+    GeneralIO = None
+
+def load_event_file(filename):
+    """Load an IED file, as for DataFile.load().
+
+    Defined at module level so that it can be run in a worker process.
+
+    Returns:
+        The EventFile object.
+    """
+    event_file = EventFile(filename)
+    with gc_paused():
+        event_file.load()
+    return event_file
+
+@contextmanager
+def gc_paused():
+    """Context manager that disables the cyclic garbage collector.
+
+    Reading a model creates many long-lived objects and no cycles that
+    need collecting, but the allocations repeatedly trigger full
+    collections whose cost grows with the size of the model (this is
+    worst when unpickling results from worker processes).
+
+    The collector is global to the process, so it is only paused from
+    the main thread (which is also the only thread of a worker
+    process). In any other thread, such as those of a server loading
+    files for several clients at once, the context has no effect:
+    overlapping loads would otherwise keep the collector off
+    indefinitely.
+    """
+    global _gc_pause_count, _gc_was_enabled
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    if _gc_pause_count == 0:
+        _gc_was_enabled = gc.isenabled()
+        gc.disable()
+    _gc_pause_count += 1
+    try:
+        yield
+    finally:
+        _gc_pause_count -= 1
+        if _gc_pause_count == 0 and _gc_was_enabled:
+            gc.enable()
+
+def _parse_spans(filename, spans):
+    """Parse a chunk of units from a file, in a worker process.
+    """
+    with DataFile(filename, use_mmap=True) as data_file, gc_paused():
+        return [span.parse(data_file) for span in spans]
+
+class LineCursor:
+    """Iterator over the lines of a DataFile that tracks its position.
+
+    Attributes:
+        index: the index of the next line that will be produced
+        stop: the index one past the last line that will be produced
+    """
+    def __init__(self, data_file, start = 0, stop = None):
+        """Constructor.
+
+        Args:
+            data_file: the DataFile object to produce lines from
+            start: the index of the first line to produce
+            stop: the index one past the last line to produce, or None
+                to continue to the end of the file
+        """
+        count = data_file.line_count()
+        self.data_file = data_file
+        self.index = start
+        self.stop = count if stop is None else min(stop, count)
+        self.line_starts = data_file.line_starts
+        self.data = data_file.data
+        self.view = data_file.view
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        index = self.index
+        if index >= self.stop:
+            raise StopIteration
+        self.index = index + 1
+        line_start = self.line_starts[index]
+        line_end = self.line_starts[index + 1] - 1
+        if line_end > line_start and self.data[line_end - 1] == 13:
+            line_end -= 1
+        return self.view[line_start:line_end]
+
+    def read_block(self, count):
+        """Read a block of lines, decoded to str objects.
+
+        The block is decoded in one go rather than line by line.
+
+        Args:
+            count: the number of lines to read
+
+        Returns:
+            A list of up to count str objects, one per line, excluding
+            the line terminators.
+        """
+        stop = min(self.index + count, self.stop)
+        if stop <= self.index:
+            return []
+        block = str(self.data_file.line_range(self.index, stop), 'latin_1')
+        self.index = stop
+        lines = block.split('\n')
+        if '\r' in block:
+            lines = [line[:-1] if line.endswith('\r') else line
+                     for line in lines]
+        return lines
+
+    def skip(self, count):
+        """Advance past lines without producing them.
+
+        Args:
+            count: the number of lines to skip
+        """
+        self.index = min(self.index + count, self.stop)
+
+class UnitSpan:
+    """The location of a unit within a data file, found by a scan.
+
+    Attributes:
+        UnitIO: the FloodModellerUnitIO class of the unit
+        start: the index of the first line of the unit
+        stop: the index one past the last line of the unit
+        node_labels: the list of node labels of the unit
+        header_lines: the number of keyword lines at the start of the
+            unit (two for units with a sub-unit keyword, otherwise one)
+    """
+    def __init__(self, UnitIO, start, stop, node_labels, *, header_lines = 1):
+        self.UnitIO = UnitIO
+        self.start = start
+        self.stop = stop
+        self.node_labels = node_labels
+        self.header_lines = header_lines
+
+    def name(self):
+        return self.node_labels[0]
+
+    def byte_range(self, data_file):
+        """Return the (start, end) offsets of the unit in the file data,
+        excluding the terminator of its final line.
+        """
+        return (data_file.line_bounds(self.start)[0],
+                data_file.line_bounds(self.stop - 1)[1])
+
+    def parse(self, data_file):
+        """Fully parse the unit.
+
+        Args:
+            data_file: the DataFile object that was scanned
+
+        Returns:
+            The FloodModellerUnitIO object, read but not validated.
+        """
+        if self.header_lines == 1:
+            uio = self.UnitIO(data_file.line(self.start))
+        else:
+            uio = self.UnitIO(data_file.line(self.start),
+                              data_file.line(self.start + 1))
+        uio.read(LineCursor(data_file, self.start + self.header_lines, self.stop))
+        uio.line_range = (self.start, self.stop)
+        return uio
+
+class LazyUnitList(Sequence):
+    """Sequence of unit IO objects that are parsed on first access.
+
+    Attributes:
+        spans: the list of UnitSpan objects describing each unit
+    """
+    def __init__(self, data_file, spans):
+        """Constructor.
+
+        Args:
+            data_file: the DataFile object the spans were scanned from
+            spans: a list of UnitSpan objects
+        """
+        self.data_file = data_file
+        self.spans = spans
+        self._units_io = [None] * len(spans)
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        uio = self._units_io[index]
+        if uio is None:
+            uio = self.spans[index].parse(self.data_file)
+            self._units_io[index] = uio
+        return uio
+
+    def is_parsed(self, index):
+        """Return whether the unit at an index has been parsed yet.
+        """
+        return self._units_io[index] is not None
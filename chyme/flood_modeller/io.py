@@ -14,20 +14,41 @@
 
 """
 
-from . import core
 from . import units
 from .io_fields import *
 import copy
 
+def startswith(line, prefix):
+    """Test whether a line from a DAT file starts with a prefix.
+
+    Works for lines produced as bytearray or memoryview objects, the
+    latter not supporting startswith() themselves.
+
+    Args:
+        line: the line from the file
+        prefix: the bytes object to look for
+
+    Returns:
+        True if the line starts with the prefix.
+    """
+    return line[:len(prefix)] == prefix
     
 class FloodModellerUnitIO:
+    # The (start, stop) indices of the lines the unit was read from, or
+    # None if it was not read from a file
+    line_range = None
+
+    # Set when the unit has been changed in a way that means it must be
+    # written out afresh rather than copied from the file it was read from
+    is_modified = False
+
     def __init__(self, first_line, second_line = None):
         # TODO: split first line by removing self.unit_name from the
         # start and storing the second half and the first-line comment
-        self.line1_comment = first_line.removeprefix(self.unit_name)
+        self.line1_comment = bytes(first_line[len(self.unit_name):])
         self.line2_comment = None
         if second_line is not None:
-            self.line2_comment = second_line.removeprefix(self.subunit_name)
+            self.line2_comment = bytes(second_line[len(self.subunit_name):])
         self.is_valid = False
         self.node_labels = []
 
@@ -60,6 +81,18 @@ class FloodModellerUnitIO:
                 component_data = component.read(self, line_iter)
                 self.data.append(component_data)
 
+    def scan(self, line_iter):
+        """Skip over the unit, reading only enough to identify it and
+        find its end.
+
+        Args:
+            line_iter: a LineCursor positioned after the unit's keyword
+                line(s)
+        """
+        for component in self.components:
+            if component.condition(self):
+                component.scan(self, line_iter)
+
     def validate(self):
         for datum in self.data:
             datum.validate()
@@ -73,11 +106,25 @@ class FloodModellerUnitIO:
 
     def create_unit(self):
         return self.UnitClass(io=self)
+
+    def mark_modified(self):
+        """Flag that the unit must be written out afresh rather than
+        copied from the file it was read from.
+        """
+        self.is_modified = True
+
+    def modified(self):
+        """Return whether the unit has been modified since it was read.
+
+        A unit is modified if it has been flagged with mark_modified() or
+        if any of the values read from the file has been changed.
+        """
+        return self.is_modified or any(datum.modified() for datum in self.data)
                 
     def write(self, out_data):
-        out_data += self.unit_name + self.l1comment + b'\n'
-        if hasattr(self, 'sub_unit_name'):
-            out_data += self.sub_unit_name + self.l2comment + b'\n'
+        out_data += self.unit_name + self.line1_comment + b'\n'
+        if self.line2_comment is not None:
+            out_data += self.subunit_name + self.line2_comment + b'\n'
         for datum in self.data:
             datum.write(out_data)
 
@@ -212,18 +259,18 @@ class RiverMuskinghamVPMCUnitIO(FloodModellerUnitIO):
         DataRow([StringDataField("data_type", 0, 10, apply_required=True)]),
         DataRow([
             IntegerDataField("vq_row_count", 0, 10, apply_required=True)],
-                condition=lambda x: x.data_type.value == 'VQ RATING'),
+                condition=AttributeEquals('data_type', 'VQ RATING')),
         DataTable("vq", "vq_row_count", "VQRowData",
                   DataRow([
                       FloatDataField("v", 0, 10),
                       FloatDataField("q", 10, 10)]),
-                  condition=lambda x: x.data_type.value == 'VQ RATING'),
+                  condition=AttributeEquals('data_type', 'VQ RATING')),
         DataRow([
             FloatDataField("a", 0, 10),
             FloatDataField("b", 10, 10),
             FloatDataField("minimum_velocity", 20, 10),
             FloatDataField("minimum_discharge", 30, 10)],
-                condition=lambda x: x.data_type.value == 'VQ POWER L'),
+                condition=AttributeEquals('data_type', 'VQ POWER L')),
     ]
     reach_unit = True
 
@@ -247,4 +294,194 @@ class RiverUnitGroupIO(FloodModellerUnitGroupIO):
         RiverCESSectionUnitIO,
         RiverMuskinghamVPMCUnitIO,
     ]
-    
+
+class FlowTimeBoundaryUnitIO(FloodModellerUnitIO):
+    UnitClass = units.FlowTimeBoundaryUnit
+    unit_name = b'QTBDY'
+    components = [
+        NodeLabelRow(),
+        DataRow([
+            IntegerDataField("qt_row_count", 0, 10, apply_required=True),
+            FloatDataField("time_lag", 10, 10, blank_value=0.0),
+            StringDataField("undoc1", 20, 10),
+            StringDataField("time_units", 30, 10, blank_value='HOURS'),
+            StringDataField("extend_method", 40, 10, blank_value='EXTEND'),
+            StringDataField("interpolation", 50, 10, blank_value='LINEAR'),
+            FloatDataField("multiplier", 60, 10, blank_value=1.0)]),
+        DataTable("qt", "qt_row_count", "QTRowData",
+                  DataRow([
+                      FloatDataField("q", 0, 10),
+                      FloatDataField("t", 10, 10)]))
+    ]
+    reach_unit = False
+
+    def __init__(self, first_line):
+        super().__init__(first_line)
+
+class HeadTimeBoundaryUnitIO(FloodModellerUnitIO):
+    UnitClass = units.HeadTimeBoundaryUnit
+    unit_name = b'HTBDY'
+    components = [
+        NodeLabelRow(),
+        DataRow([
+            IntegerDataField("ht_row_count", 0, 10, apply_required=True),
+            FloatDataField("time_lag", 10, 10, blank_value=0.0),
+            StringDataField("undoc1", 20, 10),
+            StringDataField("time_units", 30, 10, blank_value='HOURS'),
+            StringDataField("extend_method", 40, 10, blank_value='EXTEND'),
+            StringDataField("interpolation", 50, 10, blank_value='LINEAR'),
+            FloatDataField("multiplier", 60, 10, blank_value=1.0)]),
+        DataTable("ht", "ht_row_count", "HTRowData",
+                  DataRow([
+                      FloatDataField("h", 0, 10),
+                      FloatDataField("t", 10, 10)]))
+    ]
+    reach_unit = False
+
+    def __init__(self, first_line):
+        super().__init__(first_line)
+
+class FlowHeadBoundaryUnitIO(FloodModellerUnitIO):
+    UnitClass = units.FlowHeadBoundaryUnit
+    unit_name = b'QHBDY'
+    components = [
+        NodeLabelRow(),
+        DataRow([
+            IntegerDataField("qh_row_count", 0, 10, apply_required=True)]),
+        DataTable("qh", "qh_row_count", "QHRowData",
+                  DataRow([
+                      FloatDataField("q", 0, 10),
+                      FloatDataField("h", 10, 10)]))
+    ]
+    reach_unit = False
+
+    def __init__(self, first_line):
+        super().__init__(first_line)
+
+class KeywordTable:
+    """Maps keywords to objects by matching them against the start of lines.
+
+    Matching takes one dict lookup per distinct keyword length, longest
+    first, rather than comparing the line against every keyword.
+
+    Attributes:
+        entries: dict of the objects, keyed by keyword
+        lengths: the distinct lengths of the keywords, longest first
+    """
+    def __init__(self):
+        self.entries = dict()
+        self.lengths = []
+
+    def add(self, keyword, value):
+        """Add a keyword to the table.
+
+        Args:
+            keyword: the bytes object the line must start with
+            value: the object to return when the keyword is matched
+        """
+        self.entries[bytes(keyword)] = value
+        if len(keyword) not in self.lengths:
+            self.lengths.append(len(keyword))
+            self.lengths.sort(reverse=True)
+
+    def get(self, keyword):
+        """Return the object for an exact keyword, or None.
+        """
+        return self.entries.get(bytes(keyword))
+
+    def match(self, line):
+        """Find the longest keyword that the line starts with.
+
+        Args:
+            line: the line from the file
+
+        Returns:
+            The object added for the matching keyword, or None if no
+            keyword matches.
+        """
+        for length in self.lengths:
+            value = self.entries.get(bytes(line[:length]))
+            if value is not None:
+                return value
+        return None
+
+class UnitRegistry(KeywordTable):
+    """Registry of the unit IO classes that can be read from a file.
+
+    Each unit's keyword (its unit_name) maps either to the unit IO class
+    itself or, for units that have a second keyword line (a
+    subunit_name), to a KeywordTable of the sub-unit classes sharing
+    the keyword.
+    """
+    def register(self, UnitIO):
+        """Register a unit IO class, so that it is recognised when reading.
+
+        Args:
+            UnitIO: the FloodModellerUnitIO class to register, or a
+                FloodModellerUnitGroupIO class, in which case each of its
+                subunits is registered.
+
+        Returns:
+            The class, so that this can be used as a class decorator.
+        """
+        if issubclass(UnitIO, FloodModellerUnitGroupIO):
+            for SubUnitIO in UnitIO.subunits:
+                self.register(SubUnitIO)
+        elif hasattr(UnitIO, 'subunit_name'):
+            subunits = self.get(UnitIO.unit_name)
+            if not isinstance(subunits, KeywordTable):
+                subunits = KeywordTable()
+                self.add(UnitIO.unit_name, subunits)
+            subunits.add(UnitIO.subunit_name, UnitIO)
+        else:
+            self.add(UnitIO.unit_name, UnitIO)
+        return UnitIO
+
+class RegisteringList(list):
+    """A list of unit IO classes that registers each class added to it.
+
+    This stands in for the valid_units list that files.DataFile used to
+    search, so that code which adds classes to that list still has them
+    recognised. Removing a class from the list does not unregister it.
+
+    Attributes:
+        registry: the UnitRegistry that the classes are registered with
+    """
+    def __init__(self, registry, unit_ios = ()):
+        super().__init__()
+        self.registry = registry
+        self.extend(unit_ios)
+
+    def append(self, UnitIO):
+        super().append(UnitIO)
+        self.registry.register(UnitIO)
+
+    def insert(self, index, UnitIO):
+        super().insert(index, UnitIO)
+        self.registry.register(UnitIO)
+
+    def extend(self, unit_ios):
+        for UnitIO in unit_ios:
+            self.append(UnitIO)
+
+    def __iadd__(self, unit_ios):
+        self.extend(unit_ios)
+        return self
+
+unit_registry = UnitRegistry()
+unit_registry.register(InterpolateUnitIO)
+unit_registry.register(RiverUnitGroupIO)
+unit_registry.register(JunctionUnitGroupIO)
+unit_registry.register(FlowTimeBoundaryUnitIO)
+unit_registry.register(HeadTimeBoundaryUnitIO)
+unit_registry.register(FlowHeadBoundaryUnitIO)
+
+def register_unit(UnitIO):
+    """Register a unit IO class with the default registry used by
+    files.DataFile.
+
+    Can be used as a class decorator on FloodModellerUnitIO classes
+    defined outside this module.
+    """
+    return unit_registry.register(UnitIO)
+
@@ -23,8 +23,12 @@ class FieldData:
         value_str: a str object containing the data
         is_valid: a boolean indicating whether data read from the file was 
             deemed to be valid
+        is_modified: a boolean indicating whether the value has been
+            changed since it was read from the file
 
     """
+    is_modified = False
+
     def __init__(self, field):
         self.field = field
         self.value_str = field.default_str
@@ -52,6 +56,9 @@ class FieldData:
     def write(self, out_data):
         raise NotImplementedError()
 
+    def modified(self):
+        return self.is_modified
+
     @property
     def value(self):
         return self._value
@@ -60,6 +67,7 @@ class FieldData:
     def value(self, in_value):
         self._value = in_value
         self.value_str = str(in_value)
+        self.is_modified = True
 
 class KeywordData(FieldData):
     """A keyword, occupying a full line, that has been read from a DAT
@@ -73,7 +81,8 @@ class KeywordData(FieldData):
 
     def validate(self):
         # TODO: maybe just check that the line begins with the keyword
-        self.is_valid = (field.keyword == self._value)
+        self.is_valid = (self.field.keyword
+                         == self._value.encode('latin_1'))
         return self.is_valid
 
     def write(self, out_data):
@@ -101,17 +110,20 @@ class IntegerData(FieldData):
 
     """
     def __init__(self, field, value_str):
-        super().__init__(field)
-        self.value_str = value_str.strip()
-        if len(self.value_str) == 0 and field.blank_permitted:
+        # The attributes of FieldData are set directly, as this is called
+        # for every field of every row read
+        self.field = field
+        self.is_valid = False
+        value_str = value_str.strip()
+        if not value_str and field.blank_permitted:
             self.value_str = None
             self._value = field.blank_value
         else:
+            self.value_str = value_str
             try:
                 self._value = int(value_str)
             except ValueError:
                 self._value = None
-                # TODO: record the error
             
     def validate(self):
         if self._value is None:
@@ -141,17 +153,19 @@ class FloatData(FieldData):
 
     """
     def __init__(self, field, value_str):
-        super().__init__(field)
-        self.value_str = value_str.strip()
-        if len(self.value_str) == 0 and field.blank_permitted:
+        # As for IntegerData
+        self.field = field
+        self.is_valid = False
+        value_str = value_str.strip()
+        if not value_str and field.blank_permitted:
             self.value_str = None
             self._value = field.blank_value
         else:
+            self.value_str = value_str
             try:
                 self._value = float(value_str)
             except ValueError:
                 self._value = None
-                # TODO: record the error
             
     def validate(self):
         if self._value is None:
@@ -174,7 +188,6 @@ class FloatData(FieldData):
         if self.value_str is None:
             self.field.write_blank(out_data)
         else:
-            print(self._value)
             self.field.write(self._value, out_data)
 
 class StringData(FieldData):
@@ -182,17 +195,17 @@ class StringData(FieldData):
 
     """
     def __init__(self, field, value_str):
-        super().__init__(field)
-        if field.preserve_whitespace:
-            self.value_str = value_str
-        else:
-            self.value_str = value_str.strip()
-        # print(field.preserve_whitespace, '"', self.value_str, '"')
-        if len(self.value_str) == 0 and field.blank_permitted:
+        # As for IntegerData
+        self.field = field
+        self.is_valid = False
+        if not field.preserve_whitespace:
+            value_str = value_str.strip()
+        if not value_str and field.blank_permitted:
             self.value_str = None
             self._value = field.blank_value
         else:
-            self._value = self.value_str
+            self.value_str = value_str
+            self._value = value_str
             
 
     def validate(self):
@@ -233,36 +246,278 @@ class RowData:
             if datum:
                 datum.apply(obj)
 
+    def modified(self):
+        return any(datum.is_modified for datum in self.row_data)
+
     def write(self, out_data):
         for datum in self.row_data:
             datum.write(out_data)
         out_data += b'\n'
         
+class ColumnData:
+    """Base class representing a column of values read from a table in a
+    DAT file.
+
+    The values of the whole column are held together rather than in one
+    FieldData object per cell. Blank handling and validation follow the
+    same rules as the equivalent FieldData classes.
+
+    Attributes:
+        field: the FixedDataField object that defines the data format and
+            validation of every value in the column
+        values: the values read from the file
+        is_none: a bytearray with a non-zero entry for each value that is
+            None (blank or unreadable)
+        is_blank: a bytearray with a non-zero entry for each value that
+            was blank in the file
+        valid: a bytearray with a non-zero entry for each value that was
+            deemed to be valid by validate()
+        is_valid: a boolean indicating whether every value in the column
+            was deemed to be valid
+        is_modified: a boolean indicating whether any value has been
+            changed since it was read from the file
+    """
+    is_modified = False
+
+    def __init__(self, field, values, is_none, is_blank):
+        self.field = field
+        self.values = values
+        self.is_none = is_none
+        self.is_blank = is_blank
+        self.valid = bytearray(len(values))
+        self.is_valid = False
+
+    def __bool__(self):
+        return self.is_valid
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if self.is_none[index]:
+            return None
+        return self.values[index]
+
+    def __setitem__(self, index, value):
+        if value is None:
+            self.is_none[index] = True
+            self.is_blank[index] = True
+            self.values[index] = self.missing_value
+        else:
+            self.is_none[index] = False
+            self.is_blank[index] = False
+            self.values[index] = value
+        self.is_modified = True
+
+    def validate(self):
+        raise NotImplementedError()
+
+    def modified(self):
+        return self.is_modified
+
+    def select(self, indices):
+        """Return the values of a subset of the rows.
+
+        Args:
+            indices: the indices of the rows to select, or None to select
+                all of the rows
+
+        Returns:
+            A (values, is_none) tuple for the selected rows. These are
+            always copies, so that changes made to them (such as through
+            a Table) do not alter the data that will be written.
+        """
+        if indices is None:
+            return self.values[:], bytearray(self.is_none)
+        values = self.values[0:0]
+        values.extend(self.values[i] for i in indices)
+        return values, bytearray(self.is_none[i] for i in indices)
+
+    def format_cells(self):
+        """Format the whole column for writing.
+
+        Returns:
+            A list of str objects, one per row, each the width of the
+            field. Values that are None are written blank.
+        """
+        is_blank = self.is_blank
+        if is_blank != self.is_none:
+            is_blank = bytearray(blank or none for blank, none
+                                 in zip(self.is_blank, self.is_none))
+        return self.field.format_cells(self.values, is_blank)
+
+    def write_cell(self, index, out_data):
+        """Write a single value from the column to a bytearray.
+
+        Args:
+            index: the index of the row to write
+            out_data: the bytearray to which the value should be appended
+        """
+        if self.is_blank[index] or self.is_none[index]:
+            self.field.write_blank(out_data)
+        else:
+            self.field.write(self.values[index], out_data)
+
+class NumberColumnData(ColumnData):
+    """A column of integer or floating-point numbers that has been read
+    from a DAT file.
+
+    The values are held in an array. Entries that are None hold NaN
+    (floats) or zero (integers).
+    """
+    @property
+    def missing_value(self):
+        return float('nan') if self.values.typecode == 'd' else 0
+
+    def validate(self):
+        none_valid = (self.field.blank_permitted and
+                      self.field.blank_value is None)
+        lower, upper = self.field.valid_range
+        if lower is None and upper is None:
+            if none_valid or not any(self.is_none):
+                self.valid = bytearray(b'\x01') * len(self.values)
+            else:
+                self.valid = bytearray(not none for none in self.is_none)
+        else:
+            self.valid = bytearray(
+                none_valid if none else
+                ((lower is None or value >= lower) and
+                 (upper is None or value <= upper))
+                for value, none in zip(self.values, self.is_none))
+        self.is_valid = all(self.valid)
+        return self.is_valid
+
+class StringColumnData(ColumnData):
+    """A column of text strings that has been read from a DAT file.
+
+    The values are held in a list, with None for entries that are None.
+    """
+    missing_value = None
+
+    def validate(self):
+        none_valid = (self.field.blank_permitted and
+                      self.field.blank_value is None)
+        valid_values = self.field.valid_values
+        self.valid = bytearray(
+            none_valid if value is None else
+            (valid_values is None or value in valid_values)
+            for value in self.values)
+        self.is_valid = all(self.valid)
+        return self.is_valid
+
 class TableData:
-    def __init__(self, data_table, rows):
+    """A table of data that has been read from a DAT file, held as one
+    ColumnData object per field.
+
+    Attributes:
+        data_table: the DataTable object that defines the table
+        columns: the list of ColumnData objects, in field order
+        row_count: the number of rows in the table
+        row_valid: a bytearray with a non-zero entry for each row in
+            which every value was deemed to be valid by validate()
+    """
+    def __init__(self, data_table, columns, row_count):
         self.data_table = data_table
-        self.rows = rows
+        self.columns = columns
+        self.row_count = row_count
+        self.row_valid = bytearray(row_count)
         self.is_valid = False
 
     def __bool__(self):
         return self.is_valid
         
     def validate(self):
-        for row in self.rows:
-            row.validate()
-        self.is_valid = all(self.rows)
+        for column in self.columns:
+            column.validate()
+        if all(self.columns):
+            self.row_valid = bytearray(b'\x01') * self.row_count
+        else:
+            self.row_valid = bytearray(
+                all(row) for row in zip(*[c.valid for c in self.columns]))
+        self.is_valid = all(self.row_valid)
         return self.is_valid
 
     def apply(self, obj):
-        table_list = []
-        for row_data in self.rows:
-            if row_data:
-                row_obj = self.data_table.RowType()
-                row_data.apply(row_obj)
-                table_list.append(row_obj)
-        setattr(obj, self.data_table.attribute_name, table_list)
+        indices = None
+        if not self.is_valid:
+            indices = [i for i, valid in enumerate(self.row_valid) if valid]
+        table = Table(self.data_table.RowType)
+        for column in self.columns:
+            name = column.field.attribute_name
+            if name is not None:
+                table.add_column(name, *column.select(indices))
+        setattr(obj, self.data_table.attribute_name, table)
+
+    def modified(self):
+        return any(column.is_modified for column in self.columns)
         
     def write(self, out_data):
-        for row in self.rows:
-            row.write(out_data)
-        
+        # Each column is formatted as a whole, and the rows assembled and
+        # encoded in a single pass
+        if self.row_count == 0:
+            return
+        columns = [column.format_cells() for column in self.columns]
+        lines = [''.join(cells) for cells in zip(*columns)]
+        lines.append('')
+        out_data += '\n'.join(lines).encode('latin_1')
+
+class TableRow:
+    """A row of a Table, with one attribute per column.
+    """
+    pass
+
+class Table:
+    """A table of values applied to an object from a TableData object.
+
+    Each column is available as an attribute named after its field,
+    holding an array of numbers (with NaN or zero for values that are
+    None) or a list of strings. Indexing or iterating over the table
+    produces row objects with one attribute per column, in which values
+    that are None are restored. The columns are copies, so changing them
+    does not change the data that is written back to the file.
+
+    Attributes:
+        RowType: the class of the row objects
+        columns: a dict of the columns, keyed by name
+        missing: a dict of bytearrays marking the values that are None,
+            for each column that has any such values
+    """
+    def __init__(self, RowType):
+        self.RowType = RowType
+        self.columns = dict()
+        self.missing = dict()
+        self.row_count = 0
+
+    def __getattr__(self, name):
+        if name != 'columns' and name in self.columns:
+            return self.columns[name]
+        raise AttributeError(name)
+
+    def __len__(self):
+        return self.row_count
+
+    def __iter__(self):
+        for index in range(self.row_count):
+            yield self[index]
+
+    def __getitem__(self, index):
+        row = self.RowType()
+        for name, values in self.columns.items():
+            if name in self.missing and self.missing[name][index]:
+                setattr(row, name, None)
+            else:
+                setattr(row, name, values[index])
+        return row
+
+    def add_column(self, name, values, is_none):
+        """Add a column to the table.
+
+        Args:
+            name: the name of the column
+            values: the array or list of values
+            is_none: a bytearray marking the values that are None
+        """
+        self.columns[name] = values
+        if any(is_none):
+            self.missing[name] = is_none
+        self.row_count = len(values)
@@ -15,6 +15,33 @@
 """
  
 from .io_data import *
+from array import array
+
+def always(unit):
+    """Condition, met for every unit, that is the default for rows and
+    tables.
+    """
+    return True
+
+class AttributeEquals:
+    """Condition that is met when an attribute of the unit has a given
+    value.
+
+    Unlike a lambda, this can be pickled along with the row or table
+    that it belongs to.
+    """
+    def __init__(self, attribute_name, value):
+        """Constructor.
+
+        Args:
+            attribute_name: the name of the attribute of the unit to test
+            value: the value the attribute must have
+        """
+        self.attribute_name = attribute_name
+        self.value = value
+
+    def __call__(self, unit):
+        return getattr(unit, self.attribute_name, None) == self.value
 
 class DataField:
     """Base class representing some singular value or keyword in a DAT file.
@@ -55,6 +82,14 @@ class DataField:
         """
         raise NotImplementedError()
 
+    def bounds(self):
+        """Return the (start, stop) slice bounds of the field in a line.
+
+        To be implemented by derived classes. A stop of None indicates
+        that the field extends to the end of the line.
+        """
+        raise NotImplementedError()
+
     def write(self, value, out_data):
         """Write the field to the end of a bytearray
 
@@ -68,6 +103,8 @@ class Keyword(DataField):
     Attributes:
         keyword: the text of the keyword
     """
+    FieldDataType = KeywordData
+
     def __init__(self, keyword):
         """Constructor.
 
@@ -86,7 +123,10 @@ class Keyword(DataField):
         Returns:
             A KeywordData object holding the keyword that was read.
         """
-        return KeywordData(self, data[0:len(self.keyword)].decode('latin_1'))
+        return KeywordData(self, str(data[0:len(self.keyword)], 'latin_1'))
+
+    def bounds(self):
+        return 0, len(self.keyword)
 
     def write(self, value, out_data):
         """Write the keyword to a bytearray.
@@ -104,6 +144,8 @@ class FreeStringDataField(DataField):
     a full line.
 
     """
+    FieldDataType = FreeStringData
+
     def __init__(self, attribute_name):
         """Contructor.
 
@@ -122,7 +164,10 @@ class FreeStringDataField(DataField):
         Returns:
             A FreeStringData object holding the data that was read.
         """
-        return FreeStringData(self, data.decode('latin_1'))
+        return FreeStringData(self, str(data, 'latin_1'))
+
+    def bounds(self):
+        return 0, None
 
     def write(self, value, out_data):
         """Write the string to a bytearray.
@@ -169,7 +214,8 @@ class FixedDataField(DataField):
         """Read the value from the file data.
 
         Args:
-            data: the bytearray object containing the line from the file
+            data: the bytearray (or memoryview) object containing the line
+                from the file
 
         Returns:
             the value read from the file, converted to a str object. It is 
@@ -179,8 +225,67 @@ class FixedDataField(DataField):
             value_bytes = data[self.index:self.index + self.width]
         else:
             value_bytes = data[self.index:]
-            
-        return value_bytes.decode('latin_1')
+
+        # str() decodes directly from memoryview slices without copying
+        return str(value_bytes, 'latin_1')
+
+    def bounds(self):
+        return self.index, self.index + self.width
+
+    def read_cells(self, lines):
+        """Read the value from each of a block of lines.
+
+        Args:
+            lines: a list of str objects, each containing a decoded line
+                from the file
+
+        Returns:
+            A list of the str values read from each line.
+        """
+        start = self.index
+        end = self.index + self.width
+        return [line[start:end] for line in lines]
+
+    def read_numbers(self, lines, typecode, convert):
+        """Read a column of numbers from a block of lines.
+
+        Args:
+            lines: a list of str objects, each containing a decoded line
+                from the file
+            typecode: the array typecode for the values
+            convert: the function converting a str to a number
+
+        Returns:
+            A NumberColumnData object holding the data that was read.
+        """
+        cells = self.read_cells(lines)
+        try:
+            # Fast path: no blank or unreadable values
+            values = array(typecode, map(convert, cells))
+            return NumberColumnData(self, values, bytearray(len(cells)),
+                                    bytearray(len(cells)))
+        except ValueError:
+            pass
+
+        missing = float('nan') if typecode == 'd' else 0
+        values = array(typecode)
+        is_none = bytearray(len(cells))
+        is_blank = bytearray(len(cells))
+        for i, cell in enumerate(cells):
+            cell = cell.strip()
+            if len(cell) == 0 and self.blank_permitted:
+                is_blank[i] = True
+                value = self.blank_value
+            else:
+                try:
+                    value = convert(cell)
+                except ValueError:
+                    value = None
+            if value is None:
+                is_none[i] = True
+                value = missing
+            values.append(value)
+        return NumberColumnData(self, values, is_none, is_blank)
 
     def write_bytes(self, value_bytes, out_data):
         """Writes the value to a bytearray.
@@ -207,10 +312,54 @@ class FixedDataField(DataField):
         """
         self.write_bytes(b'', out_data)
 
+    def value_format(self):
+        """Return the %-format string used to format a single value.
+
+        To be implemented by derived classes. The result may be longer
+        than the width of the field, in which case it is truncated.
+        """
+        raise NotImplementedError()
+
+    def format_cells(self, values, is_blank):
+        """Format a whole column of values for writing.
+
+        Applies the same width, justification and truncation rules as
+        write() and write_blank(), but to a column of values at once,
+        using a single format string.
+
+        Args:
+            values: the values to format
+            is_blank: a sequence with a non-zero entry for each value
+                that should be written blank
+
+        Returns:
+            A list of str objects, each exactly width characters long.
+        """
+        width = self.width
+        value_format = self.value_format()
+        if any(is_blank):
+            blank = ' ' * width
+            cells = [blank if value_blank else value_format % value
+                     for value, value_blank in zip(values, is_blank)]
+        else:
+            cells = [value_format % value for value in values]
+        if any(len(cell) != width for cell in cells):
+            cells = [self.justify(cell[:width]) for cell in cells]
+        return cells
+
+    def justify(self, cell):
+        """Pad a formatted str value to the width of the field.
+        """
+        if self.justify_left:
+            return cell.ljust(self.width)
+        return cell.rjust(self.width)
+
 class IntegerDataField(FixedDataField):
     """Class representing an integer in a fixed-length field in a data file.
 
     """
+    FieldDataType = IntegerData
+
     def __init__(self, attribute_name,
                  index, width, *, 
                  valid_range = (None, None),
@@ -248,6 +397,18 @@ class IntegerDataField(FixedDataField):
         value_str = super().read_str(data)
         return IntegerData(self, value_str)
 
+    def read_column(self, lines):
+        """Read the value from each of a block of lines.
+
+        Args:
+            lines: a list of str objects, each containing a decoded line
+                from the file
+
+        Returns:
+            A NumberColumnData object holding the data that was read.
+        """
+        return self.read_numbers(lines, 'q', int)
+
     def write(self, value, data):
         """Write the value to a bytearray.
 
@@ -257,6 +418,9 @@ class IntegerDataField(FixedDataField):
         """
         formatted = bytearray(b'% *d' % (self.width, value))
         super().write_bytes(formatted, data)
+
+    def value_format(self):
+        return '%% %dd' % self.width
                             
 
 class FloatDataField(FixedDataField):
@@ -264,6 +428,8 @@ class FloatDataField(FixedDataField):
     in a data file.
 
     """
+    FieldDataType = FloatData
+
     def __init__(self, attribute_name,
                  index, width, *,
                  precision = 3,
@@ -305,6 +471,18 @@ class FloatDataField(FixedDataField):
         value_str = super().read_str(data)
         return FloatData(self, value_str)
 
+    def read_column(self, lines):
+        """Read the value from each of a block of lines.
+
+        Args:
+            lines: a list of str objects, each containing a decoded line
+                from the file
+
+        Returns:
+            A NumberColumnData object holding the data that was read.
+        """
+        return self.read_numbers(lines, 'd', float)
+
     def write(self, value, data):
         """Write the value to a bytearray.
 
@@ -315,12 +493,17 @@ class FloatDataField(FixedDataField):
         formatted = bytearray(b'% *.*f' % (self.width, self.precision, value))
         # print(formatted)
         super().write_bytes(formatted, data)
+
+    def value_format(self):
+        return '%% %d.%df' % (self.width, self.precision)
                             
 
 class StringDataField(FixedDataField):
     """Class representing a string in a fixed-length field in a data file.
 
     """
+    FieldDataType = StringData
+
     def __init__(self, attribute_name,
                  index, width, *,
                  valid_values = None,
@@ -361,6 +544,31 @@ class StringDataField(FixedDataField):
         value_str = super().read_str(data)
         return StringData(self, value_str)
 
+    def read_column(self, lines):
+        """Read the value from each of a block of lines.
+
+        Args:
+            lines: a list of str objects, each containing a decoded line
+                from the file
+
+        Returns:
+            A StringColumnData object holding the data that was read.
+        """
+        cells = self.read_cells(lines)
+        if not self.preserve_whitespace:
+            cells = [cell.strip() for cell in cells]
+        is_blank = bytearray(len(cells))
+        if self.blank_permitted:
+            is_blank = bytearray(len(cell) == 0 for cell in cells)
+            if any(is_blank):
+                cells = [cell if len(cell) > 0 else self.blank_value
+                         for cell in cells]
+        if self.blank_value is None:
+            is_none = bytearray(is_blank)
+        else:
+            is_none = bytearray(len(cells))
+        return StringColumnData(self, cells, is_none, is_blank)
+
     def write(self, value, data):
         """Write the value to a bytearray.
 
@@ -370,6 +578,11 @@ class StringDataField(FixedDataField):
         """
         super().write_bytes(value.encode('latin_1'), data)
 
+    def value_format(self):
+        if self.justify_left:
+            return '%%-%ds' % self.width
+        return '%%%ds' % self.width
+
 class DataRow:
     """Class representing a row/line containing fixed fields in a data file.
 
@@ -377,22 +590,42 @@ class DataRow:
         apply_required: boolean indicating that at least one
             field in the row must be validated and applied before the 
             remainder of the data file can be parsed
+        parsers: the compiled form of the fields, as a list of
+            (FieldDataType, field, start, stop) tuples giving the class
+            of the data object to create and the slice of the line to
+            create it from
+        apply_indices: the indices of the fields that must be applied
+            during parsing
 
     """
-    def __init__(self, fields, *, condition=lambda x: True):
+    def __init__(self, fields, *, condition=always):
         """Constructor.
 
         Args: 
             fields: a list of field objects (expected to be classes
                 derived from FixedDataField) that describe the data on 
                 the line
-            condition: a lambda that returns whether this table should be 
+            condition: a callable that returns whether this row should be 
                 read given the DataFileUnit object
 
         """
         self.fields = fields
         self.apply_required = any([x.apply_required for x in self.fields])
         self.condition = condition
+        self.compile()
+
+    def compile(self):
+        """Compile the field specifications into the parsers used to
+        read the row.
+
+        The slice bounds and data class of each field are looked up
+        once, here, so that reading a line only needs a single decode
+        followed by a slice and conversion per field.
+        """
+        self.parsers = [(field.FieldDataType, field) + field.bounds()
+                        for field in self.fields]
+        self.apply_indices = [i for i, field in enumerate(self.fields)
+                              if field.apply_required]
 
     def read(self, unit, line_iter):
         """Read the line from the file data.
@@ -405,19 +638,45 @@ class DataRow:
         Returns:
             A RowData object holding the data that was read.
         """
-        line = next(line_iter)
-        data = []
-        for field in self.fields:
-            data.append(field.read(line))
-        for datum in filter(lambda x: x.field.apply_required, data):
-            if datum.validate():
-                datum.apply(unit)
+        line = str(next(line_iter), 'latin_1')
+        data = [FieldDataType(field, line[start:stop])
+                for FieldDataType, field, start, stop in self.parsers]
+        for i in self.apply_indices:
+            if data[i].validate():
+                data[i].apply(unit)
         return RowData(data)
 
+    def scan(self, unit, line_iter):
+        """Skip over the line in the file data, reading only the fields
+        needed to parse the remainder of the unit.
+
+        Args:
+            unit: the DataFileUnit object that we are scanning
+            line_iter: iterator that produces lines from the file as bytearray
+                objects
+        """
+        line = next(line_iter)
+        if self.apply_required:
+            line = str(line, 'latin_1')
+            for i in self.apply_indices:
+                FieldDataType, field, start, stop = self.parsers[i]
+                datum = FieldDataType(field, line[start:stop])
+                if datum.validate():
+                    datum.apply(unit)
+
 class NodeLabelRow(DataRow):
     """Class representing a row/line containing a list of node labels.
 
+    The compiled fields are fixed once constructed so that a single
+    row spec can be shared between threads reading different files.
+
+    Attributes:
+        count: the number of node labels in the row, or zero if the
+            labels continue until the first blank label
     """
+    label_width = 12
+    open_label_count = 8
+
     def __init__(self, *, count = 1):
         """Constructor.
 
@@ -425,22 +684,62 @@ class NodeLabelRow(DataRow):
             count: the number of node labels in the row.
         """
         self.count = count
-        super().__init__([])
+        compiled_count = count if count > 0 else self.open_label_count
+        super().__init__([self.label_field(i) for i in range(compiled_count)])
+
+    def label_field(self, i):
+        """Create the field describing the i'th node label.
+        """
+        return StringDataField("node_labels", i*self.label_width,
+                               self.label_width, justify_left=True,
+                               attribute_index=i)
 
     def read(self, unit, line_iter):
         """Read the line from the file data.
         """
-        line = next(line_iter)
+        line = str(next(line_iter), 'latin_1')
+        parsers = self.parsers
+        if self.count > 0:
+            return RowData([FieldDataType(field, line[start:stop])
+                            for FieldDataType, field, start, stop
+                            in parsers])
+
+        # Read labels until the first blank one. Labels beyond those
+        # compiled get a field of their own rather than extending the
+        # shared spec
         data = []
-        while self.count == 0 or len(data) < self.count:
+        while True:
             i = len(data)
-            field = StringDataField("node_labels", i*12, (i+1)*12, justify_left=True, attribute_index=i)
-            datum = field.read(line)
-            if self.count == 0 and datum.value is None:
-                break
+            if i < len(parsers):
+                FieldDataType, field, start, stop = parsers[i]
             else:
-                data.append(datum)
+                field = self.label_field(i)
+                FieldDataType = field.FieldDataType
+                start, stop = field.bounds()
+            datum = FieldDataType(field, line[start:stop])
+            if datum.value is None:
+                break
+            data.append(datum)
         return RowData(data)
+
+    def scan(self, unit, line_iter):
+        """Read the node labels and apply them to the unit.
+
+        Unlike other rows, the labels are always needed from a scan so
+        that the unit can be identified.
+        """
+        line = str(next(line_iter), 'latin_1')
+        width = self.label_width
+        node_labels = []
+        while self.count == 0 or len(node_labels) < self.count:
+            i = len(node_labels)
+            label = line[i*width:(i+1)*width].strip()
+            if len(label) == 0:
+                if self.count == 0:
+                    break
+                label = None
+            node_labels.append(label)
+        unit.node_labels = node_labels
         
 class DataTable:
     """Class representing a table of data in the data file spread over 
@@ -453,7 +752,7 @@ class DataTable:
                  row_type_name,
                  row_spec,
                  *,
-                 condition=lambda x: True):
+                 condition=always):
         """Constructor.
 
         Args:
@@ -464,33 +763,44 @@ class DataTable:
                 representing each row.
             row_spec: a DataRow object (or similar) that represents a single 
                 row of the table.
-            condition: a lambda that returns whether this table should be 
+            condition: a callable that returns whether this table should be 
                 read given the DataFileUnit object
         """
         self.attribute_name = attribute_name
         self.row_count_attribute_name = row_count_attribute_name
         self.row_spec = row_spec
-        self.RowType = type(row_type_name, (object, ), dict())
+        self.row_type_name = row_type_name
+        self.RowType = TableRow
         self.apply_required = False # CHECK: do we ever need to apply a table during the parse?
         self.condition = condition
 
     def read(self, unit, line_iter):
         """Read the table from the file data.
 
+        The block of lines forming the table is decoded in one go and
+        then each field is read as a whole column, rather than creating
+        a FieldData object for every value.
+
         Args:
             unit: the DataFileUnit object that we are attempting to read the 
                 table from
-            line_iter: iterator that produces lines from the file as bytearray
-                objects
+            line_iter: a LineCursor positioned at the start of the table
 
         Returns:
             A TableData object holding the data that was read.
         """        
         rows_to_read = getattr(unit, self.row_count_attribute_name)
-        table = []
-        for row_no in range(0, rows_to_read):
-            #print("Reading row {}".format(row_no))
-            table.append(self.row_spec.read(unit, line_iter))
-        return TableData(self, table)
+        lines = line_iter.read_block(rows_to_read)
+        columns = [field.read_column(lines) for field in self.row_spec.fields]
+        return TableData(self, columns, len(lines))
+
+    def scan(self, unit, line_iter):
+        """Skip over the table in the file data without reading it.
+
+        Args:
+            unit: the DataFileUnit object that we are scanning
+            line_iter: a LineCursor positioned at the start of the table
+        """
+        line_iter.skip(getattr(unit, self.row_count_attribute_name))
     
         
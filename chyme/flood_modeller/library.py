@@ -0,0 +1,151 @@
+"""
+ Summary:
+
+    Contains functions for loading libraries of many Flood Modeller
+    (nee ISIS, nee Onda) data files
+
+ Author:
+
+    chyme contributors
+
+ Created:
+
+    17 Oct 2026
+
+"""
+
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from . import files
+
+class ModelSummary:
+    """Summary of a data file loaded as part of a library.
+
+    Attributes:
+        filename: the path of the data file
+        unit_counts: a Counter of the number of units of each type,
+            keyed by the name of the unit IO class
+        node_labels: the list of the node labels of every unit, in file
+            order
+        is_valid: a boolean indicating whether every unit in the file was
+            deemed to be valid
+        parse_time: the time taken to load the file, in seconds
+        error: None, or a description of the error that prevented the
+            file from being loaded
+        data_file: the loaded files.DataFile object, if requested,
+            otherwise None
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.unit_counts = Counter()
+        self.node_labels = []
+        self.is_valid = False
+        self.parse_time = 0.0
+        self.error = None
+        self.data_file = None
+
+    def __bool__(self):
+        return self.is_valid
+
+def find_data_files(paths, *, extensions = ('.dat',)):
+    """Expand a list of paths into a list of data files.
+
+    Args:
+        paths: a list of paths to data files and directories. Directories
+            are searched recursively.
+        extensions: the file extensions, compared without regard to
+            case, of the files to find in directories
+
+    Returns:
+        The list of paths of data files, with the files found in each
+        directory in sorted order.
+    """
+    filenames = []
+    for path in paths:
+        if not os.path.isdir(path):
+            filenames.append(path)
+            continue
+        for dirpath, dirnames, dir_filenames in os.walk(path):
+            dirnames.sort()
+            for filename in sorted(dir_filenames):
+                if os.path.splitext(filename)[1].lower() in extensions:
+                    filenames.append(os.path.join(dirpath, filename))
+    return filenames
+
+def load_summary(filename, *, keep_data_file = False, cache_dir = None):
+    """Load a data file and summarise it.
+
+    Errors while loading the file are recorded in the summary rather
+    than raised, so that one bad file does not stop a whole library
+    from being loaded.
+
+    Args:
+        filename: the path of the data file
+        keep_data_file: if True, load the whole file with
+            files.DataFile.load() and keep the DataFile object in the
+            summary. Otherwise the units are streamed with
+            files.DataFile.iter_units() and discarded.
+        cache_dir: as for files.DataFile.load(), if keep_data_file is
+            True
+
+    Returns:
+        A ModelSummary object.
+    """
+    summary = ModelSummary(filename)
+    start = time.perf_counter()
+    try:
+        data_file = files.DataFile(filename)
+        if keep_data_file:
+            data_file.load(cache_dir=cache_dir)
+            units_io = data_file.units_io
+            summary.data_file = data_file
+        else:
+            units_io = data_file.iter_units()
+        summary.is_valid = True
+        for uio in units_io:
+            summary.unit_counts[type(uio).__name__] += 1
+            summary.node_labels.extend(label for label in uio.node_labels
+                                       if label is not None)
+            summary.is_valid = summary.is_valid and uio.is_valid
+    except Exception as e:
+        summary.is_valid = False
+        summary.error = '{}: {}'.format(type(e).__name__, e)
+    summary.parse_time = time.perf_counter() - start
+    return summary
+
+def load_many(paths, *, workers = None, keep_data_files = False,
+              cache_dir = None):
+    """Load many data files, in parallel across a pool of processes.
+
+    Args:
+        paths: a list of paths to data files and directories, expanded
+            with find_data_files()
+        workers: the number of processes to use. If None or one, the
+            files are loaded in this process.
+        keep_data_files: if True, each summary also holds the loaded
+            files.DataFile object. Otherwise only the summaries are
+            returned, which is much cheaper when using several workers.
+        cache_dir: as for files.DataFile.load(), if keep_data_files is
+            True
+
+    Returns:
+        A list of ModelSummary objects, in the order of the files.
+    """
+    filenames = find_data_files(paths)
+    if workers is None or workers <= 1:
+        return [load_summary(filename, keep_data_file=keep_data_files,
+                             cache_dir=cache_dir)
+                for filename in filenames]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_load_summary, filenames,
+                                 repeat(keep_data_files), repeat(cache_dir)))
+
+def _load_summary(filename, keep_data_file, cache_dir):
+    # Positional wrapper around load_summary() for Executor.map()
+    return load_summary(filename, keep_data_file=keep_data_file,
+                        cache_dir=cache_dir)
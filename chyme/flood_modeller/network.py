@@ -14,6 +14,10 @@
 
 """
 
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 from . import files
 from .. import network
 from . import units
@@ -52,9 +56,17 @@ class FloodModellerStructure(network.Structure):
 
 class FloodModellerReach(network.Reach):
     """1D reach class representing a reach in a Flood Modeller network.
+
+    Attributes:
+        units: the list of reach-forming units, from upstream to
+            downstream
+        length: the total of the chainages (distances to the next unit)
+            of the units
     """
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, units = None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.units = [] if units is None else units
+        self.length = sum(unit.chainage for unit in self.units)
 
 class FloodModellerReachSection(network.ReachSection):
     """1D reach section class in a Flood Modeller network.
@@ -67,103 +79,314 @@ class FloodModellerNetwork(network.Network):
     """
     def __init__(self,
                  dat_filename,
-                 ied_filenames = []):
+                 ied_filenames = [],
+                 *,
+                 cache_dir = None,
+                 dat_file = None,
+                 workers = None,
+                 lean = False):
         """Constructor.
+
+        Args:
+            dat_filename: the path of the DAT file
+            ied_filenames: the paths of the IED files, in order of
+                precedence. Boundary data in a later IED file replaces
+                that for the same node in an earlier one or in the DAT
+                file.
+            cache_dir: if not None, the directory of a cache of parsed
+                DAT files (see files.DataFile.load())
+            dat_file: if not None, a files.DataFile already opened for
+                dat_filename, so that the file is not read again
+            workers: the number of processes in which to load the IED
+                files while the DAT file is loaded in this one. If None,
+                one per file, up to the number of CPUs. If one, they are
+                loaded in this process after the DAT file (as they are
+                when there is a single CPU).
+            lean: if True, keep only the units, and not the files they
+                were read from. Each unit of the DAT file is read,
+                validated and turned into a unit in turn, without the
+                IO objects for the whole file ever being held at once
+                (unless they are loaded from the cache). dat_file and
+                ied_files are then None, and the files cannot be
+                written back.
         """
         super().__init__()
         
-        # Read and validate the data file
-        self.dat_file = files.DataFile(dat_filename)
-        self.dat_file.read()
-        self.dat_file.validate()
-        if self.dat_file:
-            self.dat_file.apply()
-            self.units = self.dat_file.create_units()
+        # Read and validate the data file, and the event files alongside
+        if dat_file is None:
+            dat_file = files.DataFile(dat_filename)
+        self.dat_file = dat_file
+        if workers is None:
+            workers = min(len(ied_filenames), os.cpu_count() or 1)
+        if ied_filenames and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                ied_futures = [executor.submit(files.load_event_file, filename)
+                               for filename in ied_filenames]
+                self.units = self.load_units(cache_dir, lean)
+                self.ied_files = [future.result() for future in ied_futures]
+        else:
+            self.units = self.load_units(cache_dir, lean)
+            self.ied_files = [files.load_event_file(filename)
+                              for filename in ied_filenames]
+
+        # Boundary units, keyed by node label, with the event data
+        # overriding the DAT file
+        self.boundaries = dict()
+        self.merge_boundaries(self.units)
+        for ied_file in self.ied_files:
+            self.merge_boundaries(ied_file.create_units())
+        if lean:
+            self.dat_file = None
+            self.ied_files = None
             
         # Loop through the units in the dat file to build the network
-    #     history = []
-    #     chainage = 0.0
-    #     us_node = None
-    #     ds_node = None
-    #     for unit in self.units:
-    #         if isinstance(unit, units.ReachFormingUnit):
-    #             # This is a type of unit that can form part of a reach
-    #             history.append(unit)
-    #             chainage += unit.chainage
-    #             if len(history) == 1:
-    #                 # This is the first unit in the reach
-    #                 us_node = self.get_matching_node(unit)
-    #                 if us_node is None:
-    #                     us_node = Node(unit)
-    #                     self.nodes.append(us_node)
-    #             else:
-    #                 if unit.chainage == 0.0:
-    #                     # This is the last unit in the reach
-    #                     ds_node = self.get_matching_node(unit)
-    #                     if ds_node is None:
-    #                         ds_node = Node(unit)
-    #                         self.nodes.append(ds_node)
-    #                     reach = Reach(us=us_node, ds=ds_node, chainage=chainage)
-    #                     local_chainage = 0.0
-    #                     for cpu in history:
-    #                         cp = CalcPoint(name=cpu.name(),
-    #                                        reach=reach,
-    #                                        chainage=local_chainage)
-    #                         local_chainage += cpu.chainage
-    #                         self.icps.append(cp)
-                                                       
-    #                     self.reaches.append(reach)
-
-    #                     history = []
-    #                     #us_node = ds_node
-    #                     #ds_node = None
-    #                 else:
-    #                     # Intermediate unit in a reach
-    #                     pass
-    #         else:
-    #             # Not a type of unit that can form part of a reach
-                
-    #             # Zero or more nodes might already exist that are
-    #             # attached in some way to this unit. Get the list.
-    #             associated_nodes = []
-    #             for node_label in unit.node_labels:
-    #                 match = self.get_matching_node(node_label)
-    #                 if match is not None:
-    #                     associated_nodes.append(match)
-
-    #             print([n for n in unit.node_labels], '→', associated_nodes)
-                        
-    #             if len(associated_nodes) == 0:
-    #                 self.nodes.append(Node(unit))
-    #             elif len(associated_nodes) == 1:
-    #                 associated_nodes[0].append_unit(unit)
-    #             else:
-    #                 associated_nodes[0].append_unit(unit)
-    #                 self.merge_nodes(associated_nodes)
-
-    # def get_matching_node(self, obj=None, *, match_name=True):
-    #     name = None
-    #     if isinstance(obj, units.FloodModellerUnit):
-    #         for node in self.nodes:
-    #             if hasattr(node, "unit") and node.unit == obj:
-    #                 return node
-    #         if match_name:
-    #             name = obj.name()
-    #     elif isinstance(obj, str):
-    #         name = obj
-
-    #     if name is not None:
-    #         for node in self.nodes:
-    #             if node.name == name:
-    #                 return node
-    #             for alias in node.aliases:
-    #                 if alias == name:
-    #                     return node
-                    
-    #     return None
-
-    # def merge_nodes(self, node_list):
-    #     for node in node_list[1:]:
-    #         node_list[0].merge_with(node)
-    #         self.nodes.remove(node)
+        self.build()
+
+    @classmethod
+    def from_units(cls, unit_list):
+        """Build a network from units that have already been created,
+        without reading any files.
+
+        Args:
+            unit_list: the list of FloodModellerUnit objects, in file
+                order
+
+        Returns:
+            The new FloodModellerNetwork object. Its dat_file is None and
+            it has no ied_files.
+        """
+        net = cls.__new__(cls)
+        network.Network.__init__(net)
+        net.dat_file = None
+        net.ied_files = []
+        net.units = unit_list
+        net.boundaries = dict()
+        net.merge_boundaries(unit_list)
+        net.build()
+        return net
+
+    def load_units(self, cache_dir, lean):
+        """Load the DAT file and create its units.
+
+        Args:
+            cache_dir: as for the constructor
+            lean: if True, and the file is not to be loaded through the
+                cache, read the file a unit at a time with
+                files.DataFile.iter_units()
+
+        Returns:
+            The list of FloodModellerUnit objects.
+        """
+        if lean and cache_dir is None:
+            with files.gc_paused():
+                return list(self.dat_file.iter_units(create_units=True))
+        self.dat_file.load(cache_dir=cache_dir)
+        return self.dat_file.create_units()
+
+    def merge_boundaries(self, boundary_units):
+        """Add boundary units to the network's boundary data, replacing
+        any existing boundary at the same node.
+
+        Args:
+            boundary_units: a list of units, of which those that are
+                units.BoundaryUnit objects are added
+        """
+        for unit in boundary_units:
+            if isinstance(unit, units.BoundaryUnit):
+                self.boundaries[unit.name()] = unit
+
+    def build(self):
+        """Build the nodes and branches of the network from the units.
+
+        Each run of reach-forming units, ending with a unit with zero
+        chainage (the distance to the next unit), forms a branch, with
+        nodes at the first and last units. Every other unit, and the
+        first and last unit of each reach, is attached to a node. Units
+        sharing a node label (directly, or through other units) are
+        attached to the same node.
+
+        All the labels that refer to the same node are first gathered
+        into sets, and then one node is created per set, so that nodes
+        never have to be merged.
+        """
+        labels = network.DisjointSet()
+        attached_units = []
+        reaches = []
+        reach_units = []
+        for unit in self.units:
+            if isinstance(unit, units.ReachFormingUnit):
+                if not reach_units:
+                    attached_units.append(unit)
+                reach_units.append(unit)
+                if unit.chainage == 0.0:
+                    if len(reach_units) > 1:
+                        attached_units.append(unit)
+                    reaches.append(reach_units)
+                    reach_units = []
+            else:
+                attached_units.append(unit)
+        if reach_units:
+            if len(reach_units) > 1:
+                attached_units.append(reach_units[-1])
+            reaches.append(reach_units)
+
+        for unit in attached_units:
+            labels.union_all(label for label in unit.node_labels
+                             if label is not None)
+
+        nodes = dict()
+        for unit in attached_units:
+            if not unit.node_labels:
+                continue
+            root = labels.find(unit.name())
+            node = nodes.get(root)
+            if node is None:
+                node = FloodModellerNode(unit)
+                nodes[root] = node
+                self.add_node(node)
+            elif unit not in node.units:
+                node.append_unit(unit)
+
+        for reach_units in reaches:
+            self.add_reach(reach_units,
+                           nodes[labels.find(reach_units[0].name())],
+                           nodes[labels.find(reach_units[-1].name())])
+
+    def add_reach(self, reach_units, us_node, ds_node):
+        """Add a branch formed by a run of reach-forming units.
+
+        Each unit becomes a FloodModellerReach component of the branch,
+        at its chainage along the branch.
+
+        Args:
+            reach_units: the list of units, from upstream to downstream
+            us_node: the node at the upstream end
+            ds_node: the node at the downstream end
+
+        Returns:
+            The new FloodModellerBranch object.
+        """
+        # One component per unit, starting at the total of the
+        # chainages of the units upstream of it
+        reaches = []
+        chainage = 0.0
+        for unit in reach_units:
+            reaches.append(FloodModellerReach(unit.name(), units=[unit],
+                                              chainage=chainage))
+            chainage += unit.chainage
+        branch = FloodModellerBranch(
+            reach_units[0].name(),
+            aliases=[unit.name() for unit in reach_units[1:]],
+            components=reaches)
+        us_node.add_ds_branch(branch)
+        ds_node.add_us_branch(branch)
+        self.add_branch(branch)
+        return branch
+
+class NetworkLoader:
+    """Loads FloodModellerNetwork objects without blocking an asyncio
+    event loop.
+
+    The files are read, parsed and the networks built in an executor,
+    so that neither the file I/O nor the parsing holds up other tasks
+    on the loop. At most max_concurrent networks are loaded at once;
+    any further calls to load() wait their turn, which bounds the
+    memory used by a burst of requests.
+
+    By default the executor is a pool of threads. The garbage collector
+    is left running while the networks are built (see
+    files.gc_paused()), since it is shared with every other task in the
+    process. A ProcessPoolExecutor may be passed instead, but unpickling
+    a large network when it is returned stalls the loop for about as
+    long as the collections it avoids.
+
+    Usage:
+        async with NetworkLoader(max_concurrent=2) as loader:
+            network = await loader.load('model.dat')
+    """
+    def __init__(self, *, max_concurrent = 4, executor = None,
+                 cache_dir = None, lean = False):
+        """Constructor.
+
+        Args:
+            max_concurrent: the maximum number of networks loaded at once
+            executor: the concurrent.futures.Executor used to read the
+                files and build the networks. If None, a
+                ThreadPoolExecutor of max_concurrent threads is created,
+                and shut down by close().
+            cache_dir: as for FloodModellerNetwork
+            lean: as for FloodModellerNetwork
+        """
+        self.max_concurrent = max_concurrent
+        self.cache_dir = cache_dir
+        self.lean = lean
+        self.owns_executor = executor is None
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_concurrent)
+        self.executor = executor
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut down the executor, if it was created by this loader.
+
+        Loads still queued in the executor are cancelled.
+        """
+        if self.owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def load(self, dat_filename, ied_filenames = []):
+        """Load a network.
+
+        The load can be cancelled in the usual way, by cancelling the
+        task awaiting it. A load waiting for its turn is abandoned at
+        once. One in progress returns at once, but the file being read
+        or parsed in the executor runs to completion, and the load
+        keeps its place among the max_concurrent until it does, so that
+        cancelled loads cannot push the number running beyond the limit.
+
+        Args:
+            dat_filename: the path of the DAT file
+            ied_filenames: the paths of the IED files
+
+        Returns:
+            The FloodModellerNetwork object.
+        """
+        loop = asyncio.get_running_loop()
+        await self.semaphore.acquire()
+        future = None
+        try:
+            future = loop.run_in_executor(self.executor, files.DataFile,
+                                          dat_filename)
+            dat_file = await asyncio.shield(future)
+            future = loop.run_in_executor(
+                self.executor, _build_network, dat_filename,
+                list(ied_filenames), self.cache_dir, dat_file, self.lean)
+            return await asyncio.shield(future)
+        finally:
+            if future is None or future.done():
+                self.semaphore.release()
+            else:
+                # Cancelled while the executor is still working on the
+                # load, which keeps its slot until the work is finished
+                future.add_done_callback(self._release_abandoned)
+
+    def _release_abandoned(self, future):
+        if not future.cancelled():
+            # Retrieve any exception, which nothing else will
+            future.exception()
+        self.semaphore.release()
 
+def _build_network(dat_filename, ied_filenames, cache_dir, dat_file, lean):
+    # Positional wrapper around FloodModellerNetwork for
+    # loop.run_in_executor(). The loader's executor already runs loads
+    # side by side, so the IED files are read in the same worker rather
+    # than in a process pool per load.
+    return FloodModellerNetwork(dat_filename, ied_filenames,
+                                cache_dir=cache_dir, dat_file=dat_file,
+                                workers=1, lean=lean)
@@ -14,7 +14,120 @@
 
 """
 
+from array import array
+
+class Categorical:
+    """A sequence of values drawn from a small set of categories.
+
+    Each value is stored as an integer code indexing into the list of
+    categories. Code zero is reserved for None.
+
+    Attributes:
+        codes: an array of the code of each value
+        categories: the list of distinct values, starting with None
+    """
+    __slots__ = ('codes', 'categories')
+
+    def __init__(self, values = ()):
+        self.codes = array('H')
+        self.categories = [None]
+        lookup = {None: 0}
+        for value in values:
+            code = lookup.get(value)
+            if code is None:
+                code = len(self.categories)
+                lookup[value] = code
+                self.categories.append(value)
+            self.codes.append(code)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            categories = self.categories
+            return [categories[code] for code in self.codes[index]]
+        return self.categories[self.codes[index]]
+
+    def __iter__(self):
+        categories = self.categories
+        return (categories[code] for code in self.codes)
+
+class CrossSection:
+    """The points of a river cross-section, stored column by column.
+
+    Indexing or iterating over a cross-section produces one tuple per
+    point of (x, z, n, panel, rpl, bank_marker, easting, northing,
+    deactivation_marker), with None for values that are missing. Slicing
+    produces a list of these tuples.
+
+    Attributes:
+        x, z, n, rpl, easting, northing: arrays of floating-point values,
+            holding NaN where a value is missing
+        panel: a bytearray with a non-zero entry for each point that
+            starts a new panel
+        bank_marker, deactivation_marker: Categorical sequences of the
+            markers at each point
+    """
+    __slots__ = ('x', 'z', 'n', 'rpl', 'easting', 'northing', 'panel',
+                 'bank_marker', 'deactivation_marker')
+
+    def __init__(self, table = None):
+        """Constructor.
+
+        Args:
+            table: the io_data.Table object holding the cross-section
+                table read from a DAT file, or None for an empty
+                cross-section.
+        """
+        self.x = array('d')
+        self.z = array('d')
+        self.n = array('d')
+        self.rpl = array('d')
+        self.easting = array('d')
+        self.northing = array('d')
+        self.panel = bytearray()
+        self.bank_marker = Categorical()
+        self.deactivation_marker = Categorical()
+        if table is not None:
+            for name in ('x', 'z', 'n', 'rpl', 'easting', 'northing'):
+                getattr(self, name).extend(table.columns[name])
+            self.panel = bytearray(value == '*'
+                                   for value in table.columns['panel'])
+            self.bank_marker = Categorical(table.columns['bank_marker'])
+            self.deactivation_marker = Categorical(
+                table.columns['deactivation_marker'])
+
+    def __len__(self):
+        return len(self.x)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return (_float_or_none(self.x[index]),
+                _float_or_none(self.z[index]),
+                _float_or_none(self.n[index]),
+                bool(self.panel[index]),
+                _float_or_none(self.rpl[index]),
+                self.bank_marker[index],
+                _float_or_none(self.easting[index]),
+                _float_or_none(self.northing[index]),
+                self.deactivation_marker[index])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+def _float_or_none(value):
+    # NaN is used to mark missing values in the arrays
+    return None if value != value else value
+
 class FloodModellerUnit:
+    # Units may be kept long after the files they were read from are
+    # discarded (see network.FloodModellerNetwork), so their attributes
+    # are stored in slots rather than a dict
+    __slots__ = ('node_labels', 'line1_comment', 'line2_comment')
+
     def __init__(self, *args, io, **kwargs):
         self.node_labels = io.node_labels
         self.line1_comment = io.line1_comment
@@ -24,6 +137,13 @@ class FloodModellerUnit:
         return self.node_labels[0]
 
 class GeneralUnit(FloodModellerUnit):
+    __slots__ = ('num_units', 'lower_Fr_transition', 'upper_Fr_transition',
+                 'minimum_depth', 'direct_method_tolerance',
+                 'node_label_length', 'units_type', 'temperature',
+                 'head_tolerance', 'flow_tolerance', 'mathematical_damping',
+                 'pivotal_choice_parameter', 'under_relaxation',
+                 'matrix_dummy_coefficient', 'rad_filename')
+
     def __init__(self, *args, io, **kwargs):
         super().__init__(*args, io=io, **kwargs)
         self.num_units = io.num_units
@@ -43,37 +163,95 @@ class GeneralUnit(FloodModellerUnit):
         self.rad_filename = io.rad_filename
 
 class JunctionUnit(FloodModellerUnit):
+    __slots__ = ('conserve',)
+
     def __init__(self, *args, io, **kwargs):
         super().__init__(*args, io=io, **kwargs)
         self.conserve = io.conserve
 
 class ReachFormingUnit(FloodModellerUnit):
+    __slots__ = ('chainage',)
+
     def __init__(self, *args, io, **kwargs):
         super().__init__(*args, io=io, **kwargs)
         self.chainage = io.chainage
 
 class InterpolateUnit(ReachFormingUnit):
+    __slots__ = ('easting', 'northing')
+
     def __init__(self, *args, io, **kwargs):
         super().__init__(*args, io=io, **kwargs)
         self.easting = io.easting
         self.northing = io.northing
 
 class RiverSectionUnit(ReachFormingUnit):
+    __slots__ = ('cross_section',)
+
     def __init__(self, *args, io, **kwargs):
         super().__init__(*args, io=io, **kwargs)
-        self.cross_section = []
-        for xsp in io.xs:
-            self.cross_section.append((xsp.x, xsp.z, xsp.n, (xsp.panel=='*'),
-                                       xsp.rpl, xsp.bank_marker,
-                                       xsp.easting, xsp.northing,
-                                       xsp.deactivation_marker))
+        self.cross_section = CrossSection(io.xs)
 
 class MuskinghamVPMCUnit(ReachFormingUnit):
+    __slots__ = ('elevation', 'slope', 'minimum_subnodes',
+                 'maximum_subnodes', 'data_type')
+
     def __init__(self, *args, io, **kwargs):
-        pass
+        super().__init__(*args, io=io, **kwargs)
+        self.elevation = io.elevation
+        self.slope = io.slope
+        self.minimum_subnodes = io.minimum_subnodes
+        self.maximum_subnodes = io.maximum_subnodes
+        self.data_type = io.data_type
 
 class CESSectionUnit(ReachFormingUnit):
+    __slots__ = ()
+
     def __init__(self, *args, io, **kwargs):
         pass
 
         
+
+class BoundaryUnit(FloodModellerUnit):
+    """Base class for boundary units, the data of which may be replaced
+    by event data from an IED file.
+    """
+    __slots__ = ()
+
+    def __init__(self, *args, io, **kwargs):
+        super().__init__(*args, io=io, **kwargs)
+
+class FlowTimeBoundaryUnit(BoundaryUnit):
+    __slots__ = ('time_lag', 'time_units', 'extend_method', 'interpolation',
+                 'multiplier', 'flow', 'time')
+
+    def __init__(self, *args, io, **kwargs):
+        super().__init__(*args, io=io, **kwargs)
+        self.time_lag = io.time_lag
+        self.time_units = io.time_units
+        self.extend_method = io.extend_method
+        self.interpolation = io.interpolation
+        self.multiplier = io.multiplier
+        self.flow = array('d', io.qt.columns['q'])
+        self.time = array('d', io.qt.columns['t'])
+
+class HeadTimeBoundaryUnit(BoundaryUnit):
+    __slots__ = ('time_lag', 'time_units', 'extend_method', 'interpolation',
+                 'multiplier', 'head', 'time')
+
+    def __init__(self, *args, io, **kwargs):
+        super().__init__(*args, io=io, **kwargs)
+        self.time_lag = io.time_lag
+        self.time_units = io.time_units
+        self.extend_method = io.extend_method
+        self.interpolation = io.interpolation
+        self.multiplier = io.multiplier
+        self.head = array('d', io.ht.columns['h'])
+        self.time = array('d', io.ht.columns['t'])
+
+class FlowHeadBoundaryUnit(BoundaryUnit):
+    __slots__ = ('flow', 'head')
+
+    def __init__(self, *args, io, **kwargs):
+        super().__init__(*args, io=io, **kwargs)
+        self.flow = array('d', io.qh.columns['q'])
+        self.head = array('d', io.qh.columns['h'])
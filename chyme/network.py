@@ -14,6 +14,21 @@
 """
 
 import uuid
+from array import array
+from collections import OrderedDict, deque
+
+class NetworkLoopError(ValueError):
+    """Raised when an operation needs a network without loops but the
+    network has them.
+
+    Attributes:
+        loops: a tuple of the loops, each a tuple of the nodes in it
+    """
+    def __init__(self, loops):
+        self.loops = loops
+        super().__init__('network has {} loop(s), through nodes {}'.format(
+            len(loops), '; '.join(', '.join(node.name for node in loop)
+                                  for loop in loops)))
 
 class NetworkObject:
     """An object that is part of a network.
@@ -21,8 +36,14 @@ class NetworkObject:
     Attributes:
         name: the canonical name of the network object
         aliases: list of other names by which the object can be known
+        index: the dict mapping names to objects of the Network to which
+            the object has been added, or None
+        network: the Network to which the object has been added, or None
     """
-    def __init__(self, name, *args, aliases=[], **kwargs):
+    index = None
+    network = None
+
+    def __init__(self, name, *args, aliases=None, **kwargs):
         """Constructor.
 
         Args:
@@ -33,17 +54,25 @@ class NetworkObject:
         self.name = name
         if self.name is None:
             self.name = str(uuid.uuid4())
-        self.aliases = aliases
+        self.aliases = [] if aliases is None else list(aliases)
+
+    def names(self):
+        """Return a list of the name and aliases of the object.
+        """
+        return [self.name] + self.aliases
 
     def add_alias(self, alias):
         """Add an alias to the list of aliases.
 
         Checks to see if the supplied new alias is already in the list
         or is the name of the object, and if not, adds the alias to
-        the list.
+        the list. If the object is part of a network, the network's
+        index is updated so that the alias refers to this object.
         """
         if alias not in self.aliases and alias != self.name:
             self.aliases.append(alias)        
+        if self.index is not None:
+            self.index[alias] = self
 
     def merge_with(self, other):
         """Merge this object with another object.
@@ -69,10 +98,10 @@ class Node(NetworkObject):
     """
     def __init__(self, name=None,
                  *args,
-                 aliases=[],
+                 aliases=None,
                  location=None,
-                 us_branches=[],
-                 ds_branches=[],
+                 us_branches=None,
+                 ds_branches=None,
                  **kwargs):
         """Constructor.
 
@@ -86,8 +115,8 @@ class Node(NetworkObject):
         super().__init__(name, *args, aliases=aliases, **kwargs)
 
         self.location = location
-        self.us_branches = us_branches
-        self.ds_branches = ds_branches
+        self.us_branches = [] if us_branches is None else list(us_branches)
+        self.ds_branches = [] if ds_branches is None else list(ds_branches)
 
     def add_us_branch(self, branch):
         """Connect a branch upstream of this node.
@@ -99,6 +128,7 @@ class Node(NetworkObject):
                 # We should issue some sort of warning here
                 branch.ds_node.remove_us_branch(branch)
             branch.ds_node = self
+        self.connectivity_changed(branch)
 
     def add_ds_branch(self, branch):
         """Connect a branch downstream of this node.
@@ -110,6 +140,7 @@ class Node(NetworkObject):
                 # We should issue some sort of warning here
                 branch.us_node.remove_ds_branch(branch)
             branch.us_node = self
+        self.connectivity_changed(branch)
 
     def remove_us_branch(self, branch):
         """Disconnect a branch upstream of this node.
@@ -117,6 +148,7 @@ class Node(NetworkObject):
         if branch in self.us_branches:
             branch.ds_node = None
             self.us_branches.remove(branch)
+            self.connectivity_changed(branch)
 
     def remove_ds_branch(self, branch):
         """Disconnect a branch downstream of this node.
@@ -124,14 +156,23 @@ class Node(NetworkObject):
         if branch in self.ds_branches:
             branch.us_node = None
             self.ds_branches.remove(branch)
+            self.connectivity_changed(branch)
+
+    def connectivity_changed(self, branch):
+        """Notify the networks containing this node and a branch that
+        the connections between their nodes and branches have changed.
+        """
+        for network in (self.network, branch.network):
+            if network is not None:
+                network.invalidate()
 
     def merge_with(self, other):
         """Merge this node with another node.
         """
         super().merge_with(other)
-        for b in other.us_branches:
-            self.add_us_branches(b)
-        for b in other.ds_branches:
+        for b in list(other.us_branches):
+            self.add_us_branch(b)
+        for b in list(other.ds_branches):
             self.add_ds_branch(b)
 
 class Branch(NetworkObject):
@@ -144,15 +185,15 @@ class Branch(NetworkObject):
         aliases: a list of other names that can be used to refer to this branch.
         route: an object describing the route of this branch of the watercourse.
         components: a list of component (BranchObject) objects that form 
-            this branch.
+            this branch, in order of chainage (see add_component()).
     """
     def __init__(self, name=None,
                  us_node=None,
                  ds_node=None,
                  *args,
-                 aliases=[],
+                 aliases=None,
                  route=None,
-                 components=[],
+                 components=None,
                  **kwargs):
         super().__init__(name, *args, aliases=aliases, **kwargs)
         
@@ -160,16 +201,55 @@ class Branch(NetworkObject):
         self.ds_node = ds_node
         self.route = route
 
-        self.components = []
+        # A stable sort, so that components without a chainage keep
+        # their order
+        self.components = ([] if components is None else
+                           sorted(components, key=_chainage_key))
+
+    def add_component(self, component):
+        """Add a component (BranchObject) to the branch.
+
+        The components are kept in order of chainage, those without a
+        chainage following the rest in the order they were added.
+        """
+        key = _chainage_key(component)
+        position = len(self.components)
+        while (position > 0 and
+               _chainage_key(self.components[position - 1]) > key):
+            position -= 1
+        self.components.insert(position, component)
+        if self.network is not None:
+            self.network.invalidate()
+
+    def component_sequence(self):
+        """Return the components of the branch in order of chainage.
+
+        Components without a chainage follow the rest, in the order they
+        were added. The list of components is already kept in this
+        order, so changes made to it directly rather than through
+        add_component() must keep it so.
+        """
+        return tuple(self.components)
+
+def _chainage_key(component):
+    # Sort key placing components without a chainage last
+    return (component.chainage is None, component.chainage or 0.0)
 
 class BranchObject(NetworkObject):
     """A component of a branch.
+
+    Attributes:
+        chainage: the distance along the branch, from its upstream end,
+            at which the component starts, or None if not known
     """
     def __init__(self, name=None,
                  *args,
-                 aliases = [],
+                 aliases = None,
+                 chainage = None,
                  **kwargs):
         super().__init__(name, *args, aliases=aliases, **kwargs)
+
+        self.chainage = chainage
         
         
 class Structure(BranchObject):
@@ -177,7 +257,7 @@ class Structure(BranchObject):
     """
     def __init__(self, name=None,
                  *args,
-                 aliases = [],
+                 aliases = None,
                  location = None,
                  **kwargs):
         super().__init__(name, *args, aliases=aliases, **kwargs)
@@ -192,7 +272,7 @@ class Reach(BranchObject):
     """
     def __init__(self, name=None,
                  *args,
-                 aliases=[],
+                 aliases=None,
                  **kwargs):
         super().__init__(name, *args, aliases=aliases, **kwargs)
         
@@ -201,15 +281,698 @@ class ReachSection(NetworkObject):
     """
     def __init__(self, name=None,
                  *args,
-                 aliases = [],
+                 aliases = None,
                  location = None,
                  **kwargs):
         super().__init__(name, *args, aliases=aliases, **kwargs)
 
+class DisjointSet:
+    """A collection of disjoint sets of items (a union-find structure).
+
+    Each set is identified by one of its items, its root. Sets are
+    merged by size and paths are shortened as they are followed, so
+    any sequence of operations takes close to linear time.
+
+    Attributes:
+        parent: dict mapping each item to its parent item in its set,
+            roots being their own parents
+        size: dict mapping each root to the number of items in its set
+    """
+    def __init__(self):
+        self.parent = dict()
+        self.size = dict()
+
+    def __len__(self):
+        return len(self.parent)
+
+    def __contains__(self, item):
+        return item in self.parent
+
+    def add(self, item):
+        """Add an item as a set of its own, if it is not already present.
+        """
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+
+    def find(self, item):
+        """Return the root of the set containing an item, adding it as
+        a set of its own if it is not already present.
+        """
+        parent = self.parent
+        if item not in parent:
+            self.add(item)
+            return item
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        """Merge the sets containing two items.
+
+        Returns:
+            The root of the merged set.
+        """
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size.pop(b)
+        return a
+
+    def union_all(self, items):
+        """Merge the sets containing all of an iterable of items.
+
+        Returns:
+            The root of the merged set, or None if there were no items.
+        """
+        root = None
+        for item in items:
+            root = self.find(item) if root is None else self.union(root, item)
+        return root
+
+    def groups(self):
+        """Return a dict mapping the root of each set to the list of its
+        items, in the order in which they were added.
+        """
+        groups = dict()
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return groups
+
 class Network:
     """A one-dimensional, branched network
+
+    The nodes and branches are each indexed by their names and aliases,
+    so that they can be found without searching. The indexes are kept
+    up to date as aliases are added to objects in the network.
+
+    Attributes:
+        nodes: the list of Node objects
+        branches: the list of Branch objects
+        node_index: dict mapping the names and aliases of the nodes to
+            the nodes
+        branch_index: dict mapping the names and aliases of the
+            branches to the branches
+
+    The results of the connectivity queries (upstream_of() and so on)
+    are cached until the network is changed, either through its own
+    methods or through the methods of its nodes that connect and
+    disconnect branches. Changes made by assigning to the attributes of
+    nodes and branches directly must be followed by a call to
+    invalidate().
+
+    The cache is bounded by the total size of the results it holds (the
+    number of nodes and branches in them), rather than by their number,
+    since a single result can hold most of a large network.
     """
+    # The maximum total size of the query results kept in the cache
+    query_cache_size = 1 << 20
+
     def __init__(self):
         self.nodes = []
         self.branches = []
+        self.node_index = dict()
+        self.branch_index = dict()
+        self._topology = None
+        self._query_cache = OrderedDict()
+        self._query_cache_total = 0
+
+    def add_node(self, node):
+        """Add a node to the network, indexing its names.
+
+        A name that already refers to another node is taken over by
+        this one.
+        """
+        self.nodes.append(node)
+        self._index_object(node, self.node_index)
+        self.invalidate()
+
+    def remove_node(self, node):
+        """Remove a node from the network, and its names from the index.
+        """
+        self.nodes.remove(node)
+        self._unindex_object(node, self.node_index)
+        self.invalidate()
+
+    def add_branch(self, branch):
+        """Add a branch to the network, indexing its names.
+        """
+        self.branches.append(branch)
+        self._index_object(branch, self.branch_index)
+        self.invalidate()
+
+    def remove_branch(self, branch):
+        """Remove a branch from the network, and its names from the
+        index.
+        """
+        self.branches.remove(branch)
+        self._unindex_object(branch, self.branch_index)
+        self.invalidate()
+
+    def find_node(self, name):
+        """Return the node with a name or alias, or None.
+        """
+        return self.node_index.get(name)
+
+    def find_branch(self, name):
+        """Return the branch with a name or alias, or None.
+        """
+        return self.branch_index.get(name)
+
+    def merge_nodes(self, node_list):
+        """Merge nodes into the first of them, removing the others from
+        the network.
+
+        Args:
+            node_list: the list of nodes to merge
+
+        Returns:
+            The merged node.
+        """
+        for node in node_list[1:]:
+            if node is not node_list[0]:
+                node_list[0].merge_with(node)
+                self.remove_node(node)
+        return node_list[0]
+
+    def topology(self):
+        """Return a NetworkTopology snapshot of the network's current
+        connectivity.
+
+        The snapshot is kept and reused until the network is changed.
+        """
+        if self._topology is None:
+            self._topology = NetworkTopology(self)
+        return self._topology
+
+    def invalidate(self):
+        """Discard the cached topology and query results, after the
+        network has been changed.
+        """
+        self._topology = None
+        self._query_cache.clear()
+        self._query_cache_total = 0
+
+    def upstream_of(self, node):
+        """Return the nodes from which water can flow to a node.
+
+        Returns:
+            A tuple of the nodes, nearest first, not including the node
+            itself.
+        """
+        return self._cached_query('upstream_of', node, lambda topology:
+                                  self._reachable_nodes(topology, node,
+                                                        downstream=False))
+
+    def downstream_of(self, node):
+        """Return the nodes to which water can flow from a node.
+
+        Returns:
+            A tuple of the nodes, nearest first, not including the node
+            itself.
+        """
+        return self._cached_query('downstream_of', node, lambda topology:
+                                  self._reachable_nodes(topology, node,
+                                                        downstream=True))
+
+    def contributing_branches(self, node):
+        """Return the branches from which water can flow to a node.
+
+        Returns:
+            A tuple of the branches, in the order of the network's list
+            of branches.
+        """
+        def compute(topology):
+            upstream = topology.reachable([topology.node_id(node)],
+                                          downstream=False)
+            return tuple(branch for branch, ds in zip(topology.branches,
+                                                      topology.branch_ds)
+                         if ds >= 0 and upstream[ds])
+        return self._cached_query('contributing_branches', node, compute)
+
+    def path_between(self, us_node, ds_node):
+        """Find a route downstream from one node to another.
+
+        Args:
+            us_node: the node to start from
+            ds_node: the node to finish at
+
+        Returns:
+            A tuple of the branches along the route with the fewest
+            branches, in downstream order (empty if the nodes are the
+            same), or None if ds_node is not downstream of us_node.
+        """
+        def compute(topology):
+            start = topology.node_id(us_node)
+            end = topology.node_id(ds_node)
+            # Breadth-first search, recording the branch by which each
+            # node was first reached
+            via = {start: None}
+            queue = deque([start])
+            while queue and end not in via:
+                node_id = queue.popleft()
+                for branch_id in topology.downstream_branch_ids(node_id):
+                    next_id = topology.branch_ds[branch_id]
+                    if next_id >= 0 and next_id not in via:
+                        via[next_id] = branch_id
+                        queue.append(next_id)
+            if end not in via:
+                return None
+            path = []
+            node_id = end
+            while via[node_id] is not None:
+                branch_id = via[node_id]
+                path.append(topology.branches[branch_id])
+                node_id = topology.branch_us[branch_id]
+            return tuple(reversed(path))
+        return self._cached_query('path_between', (us_node, ds_node), compute)
+
+    def node_order(self, *, allow_loops = True):
+        """Return the nodes in topological order, each node coming
+        before every node downstream of it.
+
+        Nodes in a loop, which have no such order, are placed together
+        at the position of the loop as a whole, in the order of the
+        network's list of nodes.
+
+        Args:
+            allow_loops: if False, raise NetworkLoopError if the network
+                has any loops
+
+        Returns:
+            A tuple of the nodes.
+        """
+        if not allow_loops:
+            self._check_no_loops()
+        return self._cached_query('node_order', None, lambda topology:
+                                  tuple(topology.nodes[node_id] for node_id
+                                        in topology.order()[0]))
+
+    def branch_order(self, *, allow_loops = True):
+        """Return the branches in topological order, each branch coming
+        before every branch downstream of it, as for node_order().
+
+        Returns:
+            A tuple of the branches.
+        """
+        if not allow_loops:
+            self._check_no_loops()
+        return self._cached_query('branch_order', None, lambda topology:
+                                  tuple(topology.branches[branch_id]
+                                        for branch_id
+                                        in topology.order()[1]))
+
+    def loops(self):
+        """Find the loops in the network.
+
+        A loop is a set of nodes each of which can be reached by
+        following branches downstream from any other (including a
+        single node with a branch from itself to itself).
+
+        Returns:
+            A tuple of the loops, in topological order, each a tuple of
+            its nodes. The tuple is empty if the network has no loops.
+        """
+        return self._cached_query('loops', None, lambda topology: tuple(
+            tuple(topology.nodes[node_id] for node_id in loop)
+            for loop in topology.order()[2]))
+
+    def component_sequence(self, branch):
+        """Return the components of a branch in order of chainage.
+
+        The result is cached, as for the connectivity queries; see
+        Branch.component_sequence().
+        """
+        return self._cached_query('component_sequence', branch,
+                                  lambda topology:
+                                  branch.component_sequence())
+
+    def _check_no_loops(self):
+        loops = self.loops()
+        if loops:
+            raise NetworkLoopError(loops)
+
+    def _reachable_nodes(self, topology, node, *, downstream):
+        # Breadth-first search, so that nearer nodes come first
+        start = topology.node_id(node)
+        if downstream:
+            offsets, branch_ids, ends = (topology.ds_offsets,
+                                         topology.ds_branch_ids,
+                                         topology.branch_ds)
+        else:
+            offsets, branch_ids, ends = (topology.us_offsets,
+                                         topology.us_branch_ids,
+                                         topology.branch_us)
+        seen = bytearray(topology.node_count())
+        seen[start] = 1
+        order = []
+        queue = deque([start])
+        while queue:
+            node_id = queue.popleft()
+            for i in range(offsets[node_id], offsets[node_id + 1]):
+                end = ends[branch_ids[i]]
+                if end >= 0 and not seen[end]:
+                    seen[end] = 1
+                    order.append(end)
+                    queue.append(end)
+        return tuple(topology.nodes[node_id] for node_id in order)
+
+    def _cached_query(self, name, key, compute):
+        # Return the cached result of a query, or compute it from the
+        # topology and cache it, evicting the least recently used
+        # results until the total size is back within bounds
+        cache_key = (name, key)
+        cache = self._query_cache
+        if cache_key in cache:
+            cache.move_to_end(cache_key)
+            return cache[cache_key][0]
+        result = compute(self.topology())
+        size = _result_size(result)
+        if size > self.query_cache_size:
+            return result
+        cache[cache_key] = (result, size)
+        self._query_cache_total += size
+        while self._query_cache_total > self.query_cache_size:
+            evicted_size = cache.popitem(last=False)[1][1]
+            self._query_cache_total -= evicted_size
+        return result
+
+    def _index_object(self, obj, index):
+        obj.index = index
+        obj.network = self
+        for name in obj.names():
+            index[name] = obj
+
+    def _unindex_object(self, obj, index):
+        for name in obj.names():
+            if index.get(name) is obj:
+                del index[name]
+        obj.index = None
+        obj.network = None
         
+
+def _result_size(result):
+    # The size of a query result for the bound on the query cache: one
+    # for the entry, plus one per object in it (and in nested tuples,
+    # as returned by loops())
+    if not isinstance(result, tuple):
+        return 1
+    return 1 + sum(len(item) if isinstance(item, tuple) else 1
+                   for item in result)
+
+class NetworkTopology:
+    """An immutable, array-based snapshot of the connectivity of a
+    Network.
+
+    Nodes and branches are numbered in the order of the network's lists.
+    The branches leaving and entering each node are held in compressed
+    sparse row (CSR) form: the ids of the branches leaving node i are
+    ds_branch_ids[ds_offsets[i]:ds_offsets[i + 1]], and likewise for
+    those entering it. Later changes to the network are not reflected
+    in the snapshot.
+
+    Attributes:
+        nodes: tuple of the Node objects, indexed by node id
+        branches: tuple of the Branch objects, indexed by branch id
+        branch_us: array of the id of the node at the upstream end of
+            each branch, or -1 if the branch has no upstream node in the
+            network
+        branch_ds: array of the id of the node at the downstream end of
+            each branch, or -1
+        ds_offsets, ds_branch_ids: CSR arrays of the branches
+            downstream of (leaving) each node
+        us_offsets, us_branch_ids: CSR arrays of the branches upstream
+            of (entering) each node
+    """
+    def __init__(self, network):
+        self.nodes = tuple(network.nodes)
+        self.branches = tuple(network.branches)
+        self.node_ids = {node: i for i, node in enumerate(self.nodes)}
+        self.branch_ids = {branch: i for i, branch
+                           in enumerate(self.branches)}
+        node_ids = self.node_ids
+        self.branch_us = array('l', (node_ids.get(branch.us_node, -1)
+                                     for branch in self.branches))
+        self.branch_ds = array('l', (node_ids.get(branch.ds_node, -1)
+                                     for branch in self.branches))
+        self.ds_offsets, self.ds_branch_ids = self._csr(self.branch_us)
+        self.us_offsets, self.us_branch_ids = self._csr(self.branch_ds)
+        self._order = None
+
+    def _csr(self, branch_nodes):
+        # Group the branch ids by node with a counting sort
+        node_count = len(self.nodes)
+        offsets = array('l', [0]) * (node_count + 1)
+        for node_id in branch_nodes:
+            if node_id >= 0:
+                offsets[node_id + 1] += 1
+        for i in range(node_count):
+            offsets[i + 1] += offsets[i]
+        position = array('l', offsets[:-1])
+        branch_ids = array('l', [0]) * offsets[-1]
+        for branch_id, node_id in enumerate(branch_nodes):
+            if node_id >= 0:
+                branch_ids[position[node_id]] = branch_id
+                position[node_id] += 1
+        return offsets, branch_ids
+
+    def node_count(self):
+        return len(self.nodes)
+
+    def branch_count(self):
+        return len(self.branches)
+
+    def node_id(self, node):
+        """Return the id of a Node object.
+        """
+        return self.node_ids[node]
+
+    def branch_id(self, branch):
+        """Return the id of a Branch object.
+        """
+        return self.branch_ids[branch]
+
+    def downstream_branch_ids(self, node_id):
+        """Return the ids of the branches leaving a node.
+        """
+        return self.ds_branch_ids[self.ds_offsets[node_id]:
+                                  self.ds_offsets[node_id + 1]]
+
+    def upstream_branch_ids(self, node_id):
+        """Return the ids of the branches entering a node.
+        """
+        return self.us_branch_ids[self.us_offsets[node_id]:
+                                  self.us_offsets[node_id + 1]]
+
+    def downstream_node_ids(self, node_id):
+        """Return the ids of the nodes at the downstream ends of the
+        branches leaving a node.
+        """
+        return array('l', (self.branch_ds[b]
+                           for b in self.downstream_branch_ids(node_id)
+                           if self.branch_ds[b] >= 0))
+
+    def upstream_node_ids(self, node_id):
+        """Return the ids of the nodes at the upstream ends of the
+        branches entering a node.
+        """
+        return array('l', (self.branch_us[b]
+                           for b in self.upstream_branch_ids(node_id)
+                           if self.branch_us[b] >= 0))
+
+    def reachable(self, node_ids, *, downstream = True):
+        """Find the nodes that can be reached from a set of nodes by
+        following branches in one direction.
+
+        Args:
+            node_ids: an iterable of the ids of the nodes to start from
+            downstream: if True, follow branches downstream, otherwise
+                upstream
+
+        Returns:
+            A bytearray with a non-zero entry for each node reached,
+            including the starting nodes.
+        """
+        if downstream:
+            offsets, branch_ids, ends = (self.ds_offsets,
+                                         self.ds_branch_ids, self.branch_ds)
+        else:
+            offsets, branch_ids, ends = (self.us_offsets,
+                                         self.us_branch_ids, self.branch_us)
+        seen = bytearray(len(self.nodes))
+        stack = list(node_ids)
+        for node_id in stack:
+            seen[node_id] = 1
+        while stack:
+            node_id = stack.pop()
+            for i in range(offsets[node_id], offsets[node_id + 1]):
+                end = ends[branch_ids[i]]
+                if end >= 0 and not seen[end]:
+                    seen[end] = 1
+                    stack.append(end)
+        return seen
+
+    def connected_components(self):
+        """Label the nodes with the connected part of the network they
+        belong to, ignoring the direction of the branches.
+
+        Returns:
+            An array of the component number of each node, numbered
+            from zero in order of their first node.
+        """
+        component = array('l', [-1]) * len(self.nodes)
+        count = 0
+        for start in range(len(self.nodes)):
+            if component[start] >= 0:
+                continue
+            component[start] = count
+            queue = deque([start])
+            while queue:
+                node_id = queue.popleft()
+                for branch_id in self.downstream_branch_ids(node_id):
+                    end = self.branch_ds[branch_id]
+                    if end >= 0 and component[end] < 0:
+                        component[end] = count
+                        queue.append(end)
+                for branch_id in self.upstream_branch_ids(node_id):
+                    end = self.branch_us[branch_id]
+                    if end >= 0 and component[end] < 0:
+                        component[end] = count
+                        queue.append(end)
+            count += 1
+        return component
+
+    def strongly_connected_components(self):
+        """Find the strongly connected components of the network: the
+        largest sets of nodes each of which can be reached from every
+        other by following branches downstream.
+
+        Uses an iterative form of Tarjan's algorithm.
+
+        Returns:
+            A list of the components, each a list of node ids, in
+            reverse topological order (a component comes after every
+            component downstream of it).
+        """
+        node_count = len(self.nodes)
+        offsets, branch_ids, ends = (self.ds_offsets, self.ds_branch_ids,
+                                     self.branch_ds)
+        index = array('l', [-1]) * node_count
+        low = array('l', [0]) * node_count
+        on_stack = bytearray(node_count)
+        stack = []
+        components = []
+        counter = 0
+        for root in range(node_count):
+            if index[root] >= 0:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = 1
+            # Each entry is a node and the position of the next of its
+            # branches to follow
+            work = [[root, offsets[root]]]
+            while work:
+                entry = work[-1]
+                v, i = entry
+                if i < offsets[v + 1]:
+                    entry[1] = i + 1
+                    w = ends[branch_ids[i]]
+                    if w < 0:
+                        continue
+                    if index[w] < 0:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = 1
+                        work.append([w, offsets[w]])
+                    elif on_stack[w] and index[w] < low[v]:
+                        low[v] = index[w]
+                    continue
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+                if low[v] == index[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = 0
+                        component.append(w)
+                        if w == v:
+                            break
+                    components.append(component)
+        return components
+
+    def order(self):
+        """Compute the topological order of the nodes and branches, and
+        find the loops.
+
+        The result is computed once and kept, the snapshot being
+        immutable.
+
+        Returns:
+            A (node_ids, branch_ids, loops) tuple. node_ids is an array
+            of the node ids in topological order, with the nodes of each
+            loop together and in id order. branch_ids is an array of the
+            branch ids, ordered by the position of their upstream nodes
+            (branches without one coming first). loops is a list of
+            arrays of the node ids in each loop, in topological order.
+        """
+        if self._order is not None:
+            return self._order
+
+        # Order the components by Kahn's algorithm on the graph of the
+        # components, taking those that are ready first-come first-served
+        # so that the order follows the order of the nodes where it can
+        components = self.strongly_connected_components()
+        components.reverse()
+        component_of = array('l', [0]) * len(self.nodes)
+        for c, component in enumerate(components):
+            component.sort()
+            for node_id in component:
+                component_of[node_id] = c
+        in_degree = array('l', [0]) * len(components)
+        for us, ds in zip(self.branch_us, self.branch_ds):
+            if us >= 0 and ds >= 0 and component_of[us] != component_of[ds]:
+                in_degree[component_of[ds]] += 1
+        queue = deque(sorted((c for c in range(len(components))
+                              if in_degree[c] == 0),
+                             key=lambda c: components[c][0]))
+        node_ids = array('l')
+        loops = []
+        while queue:
+            c = queue.popleft()
+            component = components[c]
+            node_ids.extend(component)
+            is_loop = len(component) > 1
+            for node_id in component:
+                for branch_id in self.downstream_branch_ids(node_id):
+                    ds = self.branch_ds[branch_id]
+                    if ds < 0:
+                        continue
+                    if component_of[ds] == c:
+                        is_loop = True
+                        continue
+                    in_degree[component_of[ds]] -= 1
+                    if in_degree[component_of[ds]] == 0:
+                        queue.append(component_of[ds])
+            if is_loop:
+                loops.append(array('l', component))
+
+        rank = array('l', [0]) * len(self.nodes)
+        for position, node_id in enumerate(node_ids):
+            rank[node_id] = position
+        branch_ids = array('l', sorted(
+            range(len(self.branches)),
+            key=lambda branch_id: (-1 if self.branch_us[branch_id] < 0 else
+                                   rank[self.branch_us[branch_id]])))
+        self._order = (node_ids, branch_ids, loops)
+        return self._order
@@ -0,0 +1,127 @@
+"""
+ Summary:
+
+    Small Flood Modeller files used as fixtures by the tests
+
+ Author:
+
+    chyme contributors
+
+ Created:
+
+    17 Oct 2026
+
+"""
+
+import os
+
+from chyme.flood_modeller import io, units
+from chyme.flood_modeller.io_fields import (DataRow, FloatDataField,
+                                            NodeLabelRow)
+
+# Three reaches, the first starting with a Muskingham-VPMC unit, joined by
+# an open junction
+SMALL_DAT = '''Small test model
+#REVISION#1
+         8     0.750     0.900     0.100     0.001        12SI        
+    10.000     0.010     0.010     0.700     0.100     0.700     0.000
+RAD FILE
+
+END GENERAL
+RIVER
+MUSK-VPMC
+R0U         
+   172.000    99.828   0.00391     1.000    20.000
+WAVESPEED ATTENUATION
+         1
+    10.000     1.131  1000.000     1.000
+VQ RATING
+         2
+     0.300     5.000
+     0.424    10.000
+RIVER
+SECTION
+R0D         
+     0.000                1000          
+         3
+     0.000   104.148     0.060*    1.000LEFT       428183.78 275580.42          
+     2.000   102.611     0.035     1.000BED        428185.78 275580.42          
+     4.000   104.177     0.060     1.000RIGHT      428187.78 275580.42          
+RIVER
+SECTION
+R1U         
+   196.900                1000          
+         3
+     0.000   103.784     0.060*    1.000LEFT       481021.72 290216.60          
+     2.000   102.326     0.035     1.000BED        481023.72 290216.60          
+     4.000   103.843     0.060     1.000RIGHT      481025.72 290216.60          
+INTERPOLATE
+R1001       
+   143.100 447214.27 210070.12
+RIVER
+SECTION
+R1D         
+     0.000                1000          
+         3
+     0.000   103.701     0.060*    1.000LEFT       443417.18 261088.70          
+     2.000   102.207     0.035     1.000BED        443419.18 261088.70          
+     4.000   103.658     0.060     1.000RIGHT      443421.18 261088.70          
+RIVER
+SECTION
+R2U         
+   118.800                1000          
+         3
+     0.000   103.195     0.060*    1.000LEFT       401404.17 271970.47          
+     2.000   101.738     0.035     1.000BED        401406.17 271970.47          
+     4.000   103.222     0.060     1.000RIGHT      401408.17 271970.47          
+RIVER
+SECTION
+R2D         
+     0.000                1000          
+         3
+     0.000   103.222     0.060*    1.000LEFT       424391.09 232520.44          
+     2.000   101.654     0.035     1.000BED        424393.09 232520.44          
+     4.000   103.192     0.060     1.000RIGHT      424395.09 232520.44          
+JUNCTION
+OPEN
+R1D         R2D         R0U         
+INITIAL CONDITIONS
+   label   ?      flow     stage froude no  velocity     umode    ustate         z
+'''
+
+# A unit type that the library does not know, added to the small model
+SPILL_UNIT = '''SPILL test
+R1D         
+    12.500
+'''
+
+SPILL_DAT = SMALL_DAT.replace('JUNCTION\n', SPILL_UNIT + 'JUNCTION\n')
+
+class SpillUnit(units.FloodModellerUnit):
+    __slots__ = ('level',)
+
+    def __init__(self, *args, io, **kwargs):
+        super().__init__(*args, io=io, **kwargs)
+        self.level = io.level
+
+class SpillUnitIO(io.FloodModellerUnitIO):
+    UnitClass = SpillUnit
+    unit_name = b'SPILL'
+    components = [
+        NodeLabelRow(),
+        DataRow([FloatDataField("level", 0, 10)])
+    ]
+    reach_unit = False
+
+def dat_bytes(text = SMALL_DAT, *, eol = '\r\n'):
+    """Return the contents of a file, with the given line terminator.
+    """
+    return text.replace('\n', eol).encode('latin_1')
+
+def write_file(directory, name, data):
+    """Write the bytes of a file into a directory, returning its path.
+    """
+    filename = os.path.join(directory, name)
+    with open(filename, 'wb') as outfile:
+        outfile.write(data)
+    return filename
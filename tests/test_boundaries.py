@@ -0,0 +1,91 @@
+"""
+ Summary:
+
+    Tests of the boundary data of Flood Modeller networks, from the DAT
+    file and IED files
+
+ Author:
+
+    chyme contributors
+
+ Created:
+
+    17 Oct 2026
+
+"""
+
+import tempfile
+import unittest
+
+from chyme.flood_modeller import units
+from chyme.flood_modeller.network import FloodModellerNetwork
+
+from .models import SMALL_DAT, dat_bytes, write_file
+
+FLOW_TIME_IED = '''Event data
+QTBDY
+R0U         
+         2       0.0
+      10.0       0.0
+      20.0       1.0
+'''
+
+FLOW_HEAD_IED = '''Event data 2
+QHBDY comment
+R0U         
+         1
+      30.0       2.0
+'''
+
+# The small model with a flow-time boundary on its upstream node
+BOUNDARY_DAT = SMALL_DAT.replace('RIVER\nMUSK-VPMC\n', '''QTBDY
+R0U         
+         1       0.0
+       5.0       0.0
+RIVER
+MUSK-VPMC
+''', 1)
+
+class TestBoundaries(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def load(self, dat_text, ied_texts, **kwargs):
+        dat_filename = write_file(self.tmp_dir.name, 'model.dat',
+                                  dat_bytes(dat_text))
+        ied_filenames = [write_file(self.tmp_dir.name, 'event%d.ied' % i,
+                                    dat_bytes(text))
+                         for i, text in enumerate(ied_texts)]
+        return FloodModellerNetwork(dat_filename, ied_filenames, **kwargs)
+
+    def test_dat_boundary(self):
+        net = self.load(BOUNDARY_DAT, [])
+        boundary = net.boundaries['R0U']
+        self.assertIsInstance(boundary, units.FlowTimeBoundaryUnit)
+        self.assertEqual(list(boundary.flow), [5.0])
+
+    def test_later_ied_file_wins(self):
+        for workers in (None, 1, 2):
+            with self.subTest(workers=workers):
+                net = self.load(BOUNDARY_DAT,
+                                [FLOW_TIME_IED, FLOW_HEAD_IED],
+                                workers=workers)
+                self.assertEqual(list(net.boundaries), ['R0U'])
+                boundary = net.boundaries['R0U']
+                self.assertIsInstance(boundary, units.FlowHeadBoundaryUnit)
+                self.assertEqual(list(boundary.flow), [30.0])
+                self.assertEqual(list(boundary.head), [2.0])
+                self.assertEqual(len(net.ied_files), 2)
+
+    def test_ied_replaces_dat(self):
+        net = self.load(BOUNDARY_DAT, [FLOW_TIME_IED])
+        boundary = net.boundaries['R0U']
+        self.assertIsInstance(boundary, units.FlowTimeBoundaryUnit)
+        self.assertEqual(list(boundary.flow), [10.0, 20.0])
+        self.assertEqual(list(boundary.time), [0.0, 1.0])
+
+if __name__ == '__main__':
+    unittest.main()
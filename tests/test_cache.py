@@ -0,0 +1,114 @@
+"""
+ Summary:
+
+    Tests of the on-disk cache of parsed data files
+
+ Author:
+
+    chyme contributors
+
+ Created:
+
+    17 Oct 2026
+
+"""
+
+import os
+import pickle
+import tempfile
+import unittest
+
+from chyme.flood_modeller import cache, files
+
+from .models import SPILL_DAT, SpillUnitIO, dat_bytes, write_file
+
+class SpillDataFile(files.DataFile):
+    valid_units = files.DataFile.valid_units + [SpillUnitIO]
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp_dir.name, 'cache')
+        self.filename = write_file(self.tmp_dir.name, 'model.dat',
+                                   dat_bytes())
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def load(self, DataFileType = files.DataFile):
+        data_file = DataFileType(self.filename)
+        self.assertTrue(data_file.load(cache_dir=self.cache_dir))
+        return data_file
+
+    def cached_state(self, DataFileType = files.DataFile):
+        return cache.load(self.cache_dir, DataFileType(self.filename))
+
+    def cache_header(self):
+        path = cache.cache_path(self.cache_dir, self.filename)
+        with open(path, 'rb') as cache_file:
+            return cache._header.unpack(cache_file.read(cache._header.size))
+
+    def test_hit(self):
+        self.assertIsNone(self.cached_state())
+        first = self.load()
+        state = self.cached_state()
+        self.assertIsNotNone(state)
+        self.assertEqual(len(state['units_io']), len(first.units_io))
+
+        second = self.load()
+        self.assertEqual(bytes(second.write()), dat_bytes())
+        self.assertEqual([uio.node_labels for uio in second.units_io],
+                         [uio.node_labels for uio in first.units_io])
+
+    def test_stale_contents(self):
+        self.load()
+        # Same size, different contents and modification time
+        data = dat_bytes().replace(b'172.000', b'173.000')
+        write_file(self.tmp_dir.name, 'model.dat', data)
+        os.utime(self.filename, ns=(0, 0))
+        self.assertIsNone(self.cached_state())
+        data_file = self.load()
+        self.assertIn(b'173.000', bytes(data_file.write()))
+
+    def test_touched_file_refreshes_header(self):
+        self.load()
+        os.utime(self.filename, ns=(0, 123456789))
+        self.assertNotEqual(self.cache_header()[3], 123456789)
+        self.assertIsNotNone(self.cached_state())
+        self.assertEqual(self.cache_header()[3], 123456789)
+
+    def test_untrusted_directory(self):
+        self.load()
+        os.chmod(self.cache_dir, 0o777)
+        try:
+            self.assertIsNone(self.cached_state())
+            data_file = files.DataFile(self.filename)
+            self.assertFalse(cache.store(self.cache_dir, data_file, {}))
+        finally:
+            os.chmod(self.cache_dir, 0o700)
+        self.assertIsNotNone(self.cached_state())
+
+    def test_unwritable_cache_is_a_miss(self):
+        self.cache_dir = self.filename
+        self.load()
+
+    def test_tampered_entry_is_refused(self):
+        self.load()
+        path = cache.cache_path(self.cache_dir, self.filename)
+        with open(path, 'rb') as cache_file:
+            header = cache_file.read(cache._header.size)
+        with open(path, 'wb') as cache_file:
+            cache_file.write(header + pickle.dumps(os.getcwd))
+        self.assertIsNone(self.cached_state())
+
+    def test_registered_unit_type(self):
+        self.filename = write_file(self.tmp_dir.name, 'spill.dat',
+                                   dat_bytes(SPILL_DAT))
+        self.load(SpillDataFile)
+        state = self.cached_state(SpillDataFile)
+        self.assertIsNotNone(state)
+        self.assertTrue(any(isinstance(uio, SpillUnitIO)
+                            for uio in state['units_io']))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+ Summary:
+
+    Tests of reading and writing Flood Modeller DAT files
+
+ Author:
+
+    chyme contributors
+
+ Created:
+
+    17 Oct 2026
+
+"""
+
+import tempfile
+import unittest
+
+from chyme.flood_modeller import files
+from chyme.flood_modeller.io_data import TableData
+
+from .models import dat_bytes, write_file
+
+def mixed_line_endings(data):
+    # Terminate every third line with LF rather than CR LF
+    lines = data.split(b'\r\n')
+    return b''.join(line + (b'\n' if i % 3 == 0 else b'\r\n')
+                    for i, line in enumerate(lines[:-1]))
+
+class DataFileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def load(self, data):
+        filename = write_file(self.tmp_dir.name, 'model.dat', data)
+        data_file = files.DataFile(filename)
+        self.assertTrue(data_file.load())
+        return data_file
+
+class TestRoundTrip(DataFileTestCase):
+    def assert_round_trip(self, data):
+        data_file = self.load(data)
+        self.assertEqual(bytes(data_file.write()), data)
+
+    def test_crlf(self):
+        self.assert_round_trip(dat_bytes())
+
+    def test_lf(self):
+        self.assert_round_trip(dat_bytes(eol='\n'))
+
+    def test_mixed(self):
+        data = mixed_line_endings(dat_bytes())
+        self.assertIn(b'\r\n', data)
+        self.assertGreater(data.count(b'\n'), data.count(b'\r\n'))
+        self.assert_round_trip(data)
+
+    def test_no_final_terminator(self):
+        self.assert_round_trip(dat_bytes()[:-2])
+        self.assert_round_trip(dat_bytes(eol='\n')[:-1])
+
+    def test_lazy(self):
+        data = dat_bytes()
+        data_file = self.load(data)
+        data_file.read(lazy=True)
+        self.assertEqual(bytes(data_file.write()), data)
+
+class TestModifiedUnits(DataFileTestCase):
+    def sections(self, data_file):
+        return [uio for uio in data_file.units_io if hasattr(uio, 'xs')]
+
+    def test_edited_unit_is_reformatted(self):
+        data = dat_bytes()
+        data_file = self.load(data)
+        uio = self.sections(data_file)[1]
+        start, stop = uio.line_range
+        table = next(datum for datum in uio.data
+                     if isinstance(datum, TableData))
+        table.columns[0][0] = 987.5
+        self.assertTrue(uio.modified())
+
+        lines = data.split(b'\r\n')
+        out_data = bytes(data_file.write())
+        before = b''.join(line + b'\r\n' for line in lines[:start])
+        after = b''.join(line + b'\r\n' for line in lines[stop:-1])
+        self.assertTrue(out_data.startswith(before))
+        self.assertTrue(out_data.endswith(after))
+        unit_data = out_data[len(before):len(out_data) - len(after)]
+        self.assertIn(b'   987.500', unit_data)
+
+        reread = self.load(out_data)
+        reread_uio = self.sections(reread)[1]
+        self.assertEqual(reread_uio.xs.columns['x'][0], 987.5)
+        self.assertEqual(list(reread_uio.xs.columns['z']),
+                         list(uio.xs.columns['z']))
+
+    def test_reformatting_is_stable(self):
+        data_file = self.load(dat_bytes())
+        for uio in data_file.units_io:
+            uio.mark_modified()
+        reformatted = bytes(data_file.write())
+
+        reread = self.load(reformatted)
+        self.assertEqual(len(reread.units_io), len(data_file.units_io))
+        for uio in reread.units_io:
+            uio.mark_modified()
+        self.assertEqual(bytes(reread.write()), reformatted)
+
+    def test_table_edit_does_not_reach_file(self):
+        data = dat_bytes()
+        data_file = self.load(data)
+        uio = self.sections(data_file)[0]
+        uio.xs.columns['x'][0] = 999.0
+        self.assertFalse(uio.modified())
+        self.assertEqual(bytes(data_file.write()), data)
+
+class TestParallelRead(DataFileTestCase):
+    def summary(self, data_file):
+        return [(type(uio), uio.node_labels, uio.line_range)
+                for uio in data_file.units_io]
+
+    def test_same_units_in_order(self):
+        data = dat_bytes()
+        serial = self.load(data)
+        parallel = files.DataFile(serial.filename)
+        parallel.read(workers=2)
+        self.assertTrue(parallel.validate())
+        parallel.apply()
+        self.assertEqual(self.summary(parallel), self.summary(serial))
+        self.assertEqual([list(uio.xs.columns['z']) for uio
+                          in parallel.units_io if hasattr(uio, 'xs')],
+                         [list(uio.xs.columns['z']) for uio
+                          in serial.units_io if hasattr(uio, 'xs')])
+        self.assertEqual(bytes(parallel.write()), data)
+
+    def test_more_workers_than_units(self):
+        serial = self.load(dat_bytes())
+        parallel = files.DataFile(serial.filename)
+        parallel.read(workers=len(serial.units_io) + 3)
+        parallel.validate()
+        parallel.apply()
+        self.assertEqual(self.summary(parallel), self.summary(serial))
+
+class TestTruncatedFiles(DataFileTestCase):
+    def assert_read_fails(self, data, message):
+        filename = write_file(self.tmp_dir.name, 'model.dat', data)
+        with self.assertRaisesRegex(RuntimeError, message):
+            files.DataFile(filename).read()
+        with self.assertRaisesRegex(RuntimeError, message):
+            list(files.DataFile(filename).iter_units())
+
+    def test_empty_file(self):
+        self.assert_read_fails(b'', 'No lines')
+
+    def test_file_ending_in_header(self):
+        self.assert_read_fails(dat_bytes()[:30], 'general header')
+
+if __name__ == '__main__':
+    unittest.main()
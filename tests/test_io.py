@@ -0,0 +1,78 @@
+"""
+ Summary:
+
+    Tests of registering the unit types read from DAT files
+
+ Author:
+
+    chyme contributors
+
+ Created:
+
+    17 Oct 2026
+
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from chyme.flood_modeller import files, io
+
+from .models import SPILL_DAT, SpillUnit, SpillUnitIO, dat_bytes, write_file
+
+class TestUnitRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = write_file(self.tmp_dir.name, 'spill.dat',
+                                   dat_bytes(SPILL_DAT))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def spill_units(self, data_file):
+        data_file.load()
+        return [unit for unit in data_file.create_units()
+                if isinstance(unit, SpillUnit)]
+
+    def test_unknown_unit_is_skipped(self):
+        self.assertEqual(self.spill_units(files.DataFile(self.filename)), [])
+
+    def test_registry(self):
+        class SpillDataFile(files.DataFile):
+            unit_registry = io.UnitRegistry()
+        for UnitIO in files.DataFile.valid_units:
+            SpillDataFile.unit_registry.register(UnitIO)
+        SpillDataFile.unit_registry.register(SpillUnitIO)
+
+        spills = self.spill_units(SpillDataFile(self.filename))
+        self.assertEqual([(unit.name(), unit.level) for unit in spills],
+                         [('R1D', 12.5)])
+
+    def test_valid_units_in_subclass(self):
+        class SpillDataFile(files.DataFile):
+            valid_units = files.DataFile.valid_units + [SpillUnitIO]
+
+        self.assertEqual(len(self.spill_units(SpillDataFile(self.filename))),
+                         1)
+        self.assertEqual(self.spill_units(files.DataFile(self.filename)), [])
+
+    def test_valid_units_append(self):
+        class SpillDataFile(files.DataFile):
+            valid_units = list(files.DataFile.valid_units)
+
+        self.assertEqual(self.spill_units(SpillDataFile(self.filename)), [])
+        SpillDataFile.valid_units.append(SpillUnitIO)
+        self.assertEqual(len(self.spill_units(SpillDataFile(self.filename))),
+                         1)
+
+    def test_io_imported_first(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.run([sys.executable, '-c',
+                        'from chyme.flood_modeller import io; '
+                        'io.register_unit'], cwd=root, check=True)
+
+if __name__ == '__main__':
+    unittest.main()
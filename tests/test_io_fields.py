@@ -0,0 +1,57 @@
+"""
+ Summary:
+
+    Tests of formatting the columns of DAT file tables
+
+ Author:
+
+    chyme contributors
+
+ Created:
+
+    17 Oct 2026
+
+"""
+
+import unittest
+from array import array
+
+from chyme.flood_modeller.io_data import NumberColumnData, StringColumnData
+from chyme.flood_modeller.io_fields import (FloatDataField, IntegerDataField,
+                                            StringDataField)
+
+class TestColumnFormatting(unittest.TestCase):
+    def assert_cells_match_writes(self, column):
+        cells = column.format_cells()
+        for index, cell in enumerate(cells):
+            out_data = bytearray()
+            column.write_cell(index, out_data)
+            self.assertEqual(cell.encode('latin_1'), bytes(out_data))
+
+    def test_float_column(self):
+        values = [0.0, 1.5, -2.25, 123456.789, -0.001, 1e12, 99999999.0]
+        is_none = bytearray(len(values)) + b'\x01'
+        column = NumberColumnData(FloatDataField('x', 0, 10),
+                                  array('d', values + [float('nan')]),
+                                  is_none, bytearray(is_none))
+        self.assert_cells_match_writes(column)
+
+    def test_integer_column(self):
+        values = [0, 7, -12, 1234567890123]
+        column = NumberColumnData(IntegerDataField('n', 0, 10),
+                                  array('q', values),
+                                  bytearray(len(values)),
+                                  bytearray(len(values)))
+        self.assert_cells_match_writes(column)
+
+    def test_string_column(self):
+        for justify_left in (False, True):
+            values = ['LEFT', '', 'A_VERY_LONG_LABEL', None]
+            is_none = bytearray(value is None for value in values)
+            column = StringColumnData(
+                StringDataField('s', 0, 10, justify_left=justify_left),
+                values, is_none, bytearray(is_none))
+            self.assert_cells_match_writes(column)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+ Summary:
+
+    Tests of loading Flood Modeller networks from asyncio code
+
+ Author:
+
+    chyme contributors
+
+ Created:
+
+    17 Oct 2026
+
+"""
+
+import asyncio
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from chyme.flood_modeller.network import NetworkLoader
+
+from .models import dat_bytes, write_file
+
+class GatedExecutor(ThreadPoolExecutor):
+    """Thread pool that counts the jobs running at once, and can hold
+    jobs until a gate is opened.
+    """
+    def __init__(self):
+        super().__init__(max_workers=8)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.started = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def submit(self, fn, *args, **kwargs):
+        def job():
+            with self.lock:
+                self.running += 1
+                self.started += 1
+                self.max_running = max(self.max_running, self.running)
+            try:
+                self.gate.wait()
+                return fn(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.running -= 1
+        return super().submit(job)
+
+async def wait_for(condition):
+    while not condition():
+        await asyncio.sleep(0.001)
+
+class TestNetworkLoader(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = write_file(self.tmp_dir.name, 'model.dat',
+                                   dat_bytes())
+        self.executor = GatedExecutor()
+
+    def tearDown(self):
+        self.executor.gate.set()
+        self.executor.shutdown()
+        self.tmp_dir.cleanup()
+
+    def test_limit(self):
+        executor = self.executor
+
+        async def main():
+            loader = NetworkLoader(max_concurrent=2, executor=executor)
+            executor.gate.clear()
+            loads = asyncio.gather(*[loader.load(self.filename)
+                                     for i in range(6)])
+            await wait_for(lambda: executor.running == 2)
+            await asyncio.sleep(0.05)
+            self.assertEqual(executor.started, 2)
+            executor.gate.set()
+            return await loads
+
+        networks = asyncio.run(main())
+        self.assertEqual([len(net.branches) for net in networks], [3] * 6)
+        self.assertEqual(executor.max_running, 2)
+
+    def test_cancelled_load_keeps_slot(self):
+        executor = self.executor
+
+        async def main():
+            loader = NetworkLoader(max_concurrent=1, executor=executor)
+            executor.gate.clear()
+            first = asyncio.create_task(loader.load(self.filename))
+            await wait_for(lambda: executor.running == 1)
+            first.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await first
+
+            # The cancelled load's job is still running, so the next
+            # load must wait for it
+            second = asyncio.create_task(loader.load(self.filename))
+            await asyncio.sleep(0.05)
+            self.assertEqual(executor.started, 1)
+
+            executor.gate.set()
+            net = await second
+            self.assertEqual(executor.max_running, 1)
+            return net
+
+        self.assertEqual(len(asyncio.run(main()).branches), 3)
+
+    def test_cancel_while_waiting(self):
+        executor = self.executor
+
+        async def main():
+            loader = NetworkLoader(max_concurrent=1, executor=executor)
+            executor.gate.clear()
+            first = asyncio.create_task(loader.load(self.filename))
+            waiting = asyncio.create_task(loader.load(self.filename))
+            await asyncio.sleep(0.05)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            executor.gate.set()
+            await first
+            self.assertEqual(executor.started, 2)
+
+        asyncio.run(main())
+
+if __name__ == '__main__':
+    unittest.main()
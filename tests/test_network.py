@@ -0,0 +1,285 @@
+"""
+ Summary:
+
+    Tests of 1D networks: the index of names, the ordering and loop
+    detection, and the building of networks from Flood Modeller files
+
+ Author:
+
+    chyme contributors
+
+ Created:
+
+    17 Oct 2026
+
+"""
+
+import tempfile
+import unittest
+
+from chyme import network
+from chyme.flood_modeller.network import FloodModellerNetwork
+
+from .models import SMALL_DAT, dat_bytes, write_file
+
+def build(links):
+    """Build a network from a list of (us_name, ds_name) branches.
+    """
+    net = network.Network()
+    nodes = dict()
+    for names in links:
+        for name in names:
+            if name not in nodes:
+                nodes[name] = network.Node(name)
+                net.add_node(nodes[name])
+    for us_name, ds_name in links:
+        branch = network.Branch(us_name + ds_name)
+        nodes[us_name].add_ds_branch(branch)
+        nodes[ds_name].add_us_branch(branch)
+        net.add_branch(branch)
+    return net, nodes
+
+def names(objects):
+    return [obj.name for obj in objects]
+
+class TestIndex(unittest.TestCase):
+    def test_find_by_name_and_alias(self):
+        net, nodes = build([('A', 'B')])
+        self.assertIs(net.find_node('A'), nodes['A'])
+        self.assertIs(net.find_branch('AB'), net.branches[0])
+        self.assertIsNone(net.find_node('X'))
+
+        nodes['A'].add_alias('A2')
+        net.branches[0].add_alias('AB2')
+        self.assertIs(net.find_node('A2'), nodes['A'])
+        self.assertIs(net.find_branch('AB2'), net.branches[0])
+
+    def test_alias_before_adding(self):
+        net = network.Network()
+        node = network.Node('A', aliases=['A1'])
+        node.add_alias('A2')
+        net.add_node(node)
+        self.assertEqual([net.find_node(name) for name in ('A', 'A1', 'A2')],
+                         [node] * 3)
+
+    def test_merge_nodes(self):
+        net, nodes = build([('A', 'B'), ('C', 'D')])
+        nodes['C'].add_alias('C1')
+        merged = net.merge_nodes([nodes['B'], nodes['C']])
+        self.assertIs(merged, nodes['B'])
+        self.assertEqual(names(net.nodes), ['A', 'B', 'D'])
+        for name in ('B', 'C', 'C1'):
+            self.assertIs(net.find_node(name), merged)
+        self.assertIsNone(nodes['C'].network)
+        self.assertEqual(names(net.downstream_of(nodes['A'])), ['B', 'D'])
+
+    def test_remove_node(self):
+        net, nodes = build([('A', 'B')])
+        nodes['B'].add_alias('B1')
+        net.remove_node(nodes['B'])
+        self.assertIsNone(net.find_node('B'))
+        self.assertIsNone(net.find_node('B1'))
+        self.assertIsNone(nodes['B'].index)
+
+        # An alias added after removal does not reach the old index
+        nodes['B'].add_alias('B2')
+        self.assertIsNone(net.find_node('B2'))
+
+    def test_removing_node_keeps_names_taken_over(self):
+        net, nodes = build([('A', 'B')])
+        other = network.Node('B')
+        net.add_node(other)
+        self.assertIs(net.find_node('B'), other)
+        net.remove_node(nodes['B'])
+        self.assertIs(net.find_node('B'), other)
+
+    def test_remove_branch(self):
+        net, nodes = build([('A', 'B'), ('B', 'C')])
+        branch = net.find_branch('BC')
+        branch.add_alias('BC1')
+        net.remove_branch(branch)
+        self.assertIsNone(net.find_branch('BC'))
+        self.assertIsNone(net.find_branch('BC1'))
+        self.assertIs(net.find_branch('AB'), net.branches[0])
+
+class TestQueries(unittest.TestCase):
+    def test_queries(self):
+        net, nodes = build([('A', 'C'), ('B', 'C'), ('C', 'D')])
+        self.assertEqual(names(net.downstream_of(nodes['A'])), ['C', 'D'])
+        self.assertEqual(sorted(names(net.upstream_of(nodes['D']))),
+                         ['A', 'B', 'C'])
+        self.assertEqual(names(net.contributing_branches(nodes['C'])),
+                         ['AC', 'BC'])
+        self.assertEqual(names(net.path_between(nodes['A'], nodes['D'])),
+                         ['AC', 'CD'])
+        self.assertIsNone(net.path_between(nodes['D'], nodes['A']))
+
+    def test_add_us_branch_invalidates(self):
+        net, nodes = build([('A', 'B')])
+        self.assertEqual(names(net.upstream_of(nodes['B'])), ['A'])
+        node = network.Node('X')
+        net.add_node(node)
+        branch = network.Branch('XA')
+        net.add_branch(branch)
+        self.assertEqual(names(net.upstream_of(nodes['B'])), ['A'])
+
+        # Connecting the branch through the nodes alone is seen
+        nodes['A'].add_us_branch(branch)
+        self.assertEqual(names(net.upstream_of(nodes['B'])), ['A'])
+        node.add_ds_branch(branch)
+        self.assertEqual(names(net.upstream_of(nodes['B'])), ['A', 'X'])
+
+    def test_remove_ds_branch_invalidates(self):
+        net, nodes = build([('A', 'B'), ('B', 'C')])
+        self.assertEqual(names(net.downstream_of(nodes['A'])), ['B', 'C'])
+        self.assertEqual(names(net.upstream_of(nodes['C'])), ['B', 'A'])
+        nodes['B'].remove_ds_branch(net.find_branch('BC'))
+        self.assertEqual(names(net.downstream_of(nodes['A'])), ['B'])
+        self.assertEqual(names(net.upstream_of(nodes['C'])), [])
+
+    def test_cache_is_bounded_by_size(self):
+        net, nodes = build([(str(i), str(i + 1)) for i in range(20)])
+        net.query_cache_size = 30
+        first = nodes['0']
+        self.assertEqual(len(net.downstream_of(first)), 20)
+        self.assertEqual(net._query_cache_total, 21)
+        # Evicts the first result, which would take the total over 30
+        self.assertEqual(len(net.upstream_of(nodes['20'])), 20)
+        self.assertEqual(net._query_cache_total, 21)
+        self.assertEqual(list(net._query_cache),
+                         [('upstream_of', nodes['20'])])
+        # A result bigger than the cache as a whole is not cached
+        net.query_cache_size = 10
+        net.invalidate()
+        net.downstream_of(first)
+        self.assertEqual(len(net._query_cache), 0)
+
+class TestOrder(unittest.TestCase):
+    def assert_topological(self, net, order):
+        position = {node: i for i, node in enumerate(order)}
+        for branch in net.branches:
+            self.assertLess(position[branch.us_node],
+                            position[branch.ds_node])
+
+    def test_tree(self):
+        net, nodes = build([('C', 'D'), ('A', 'C'), ('B', 'C'), ('D', 'E')])
+        order = net.node_order(allow_loops=False)
+        self.assertEqual(len(order), 5)
+        self.assert_topological(net, order)
+        self.assertEqual(net.loops(), ())
+        branch_order = names(net.branch_order())
+        self.assertEqual(branch_order[-1], 'DE')
+        self.assertLess(branch_order.index('AC'), branch_order.index('CD'))
+
+    def test_order_follows_changes(self):
+        net, nodes = build([('A', 'B'), ('B', 'C')])
+        self.assertEqual(names(net.node_order()), ['A', 'B', 'C'])
+        branch = network.Branch('CA')
+        nodes['C'].add_ds_branch(branch)
+        nodes['A'].add_us_branch(branch)
+        net.add_branch(branch)
+        self.assertEqual(len(net.loops()), 1)
+
+class TestComponents(unittest.TestCase):
+    def test_sequence(self):
+        def component(name, chainage):
+            return network.BranchObject(name, chainage=chainage)
+
+        branch = network.Branch('A', components=[
+            component('c', 20.0), component('x', None), component('a', 0.0),
+            component('y', None), component('b', 10.0)])
+        self.assertEqual(names(branch.component_sequence()),
+                         ['a', 'b', 'c', 'x', 'y'])
+        branch.add_component(component('z', None))
+        branch.add_component(component('b2', 10.0))
+        branch.add_component(component('a2', 5.0))
+        self.assertEqual(names(branch.component_sequence()),
+                         ['a', 'a2', 'b', 'b2', 'c', 'x', 'y', 'z'])
+
+    def test_network_sequence_follows_changes(self):
+        net, nodes = build([('A', 'B')])
+        branch = net.branches[0]
+        branch.add_component(network.BranchObject('b', chainage=10.0))
+        self.assertEqual(names(net.component_sequence(branch)), ['b'])
+        branch.add_component(network.BranchObject('a', chainage=0.0))
+        self.assertEqual(names(net.component_sequence(branch)), ['a', 'b'])
+
+class TestLoops(unittest.TestCase):
+    def test_loop_is_found(self):
+        # A -> B -> C -> D, with C -> B closing a loop through B and C
+        net, nodes = build([('A', 'B'), ('B', 'C'), ('C', 'B'), ('C', 'D')])
+        loops = net.loops()
+        self.assertEqual(len(loops), 1)
+        self.assertEqual(sorted(names(loops[0])), ['B', 'C'])
+
+        order = names(net.node_order())
+        self.assertEqual(order[0], 'A')
+        self.assertEqual(sorted(order[1:3]), ['B', 'C'])
+        self.assertEqual(order[3], 'D')
+
+    def test_self_loop(self):
+        net, nodes = build([('A', 'B'), ('B', 'B')])
+        self.assertEqual([names(loop) for loop in net.loops()], [['B']])
+
+    def test_separate_loops(self):
+        net, nodes = build([('A', 'B'), ('B', 'A'), ('B', 'C'),
+                            ('C', 'D'), ('D', 'E'), ('E', 'C')])
+        loops = [sorted(names(loop)) for loop in net.loops()]
+        self.assertEqual(loops, [['A', 'B'], ['C', 'D', 'E']])
+
+    def test_strict_order_raises(self):
+        net, nodes = build([('A', 'B'), ('B', 'C'), ('C', 'A')])
+        with self.assertRaises(network.NetworkLoopError) as context:
+            net.node_order(allow_loops=False)
+        self.assertEqual(len(context.exception.loops), 1)
+        self.assertEqual(sorted(names(context.exception.loops[0])),
+                         ['A', 'B', 'C'])
+        with self.assertRaises(network.NetworkLoopError):
+            net.branch_order(allow_loops=False)
+
+JUNCTION = 'JUNCTION\nOPEN\nR1D         R2D         R0U         \n'
+
+class TestFloodModellerBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def load(self, text):
+        filename = write_file(self.tmp_dir.name, 'model.dat',
+                              dat_bytes(text))
+        return FloodModellerNetwork(filename)
+
+    def assert_joined(self, net):
+        self.assertEqual(len(net.nodes), 4)
+        joined = net.find_node('R0U')
+        self.assertEqual(sorted(joined.names()), ['R0U', 'R1D', 'R2D'])
+        self.assertIs(net.find_node('R1D'), joined)
+        self.assertIs(net.find_node('R2D'), joined)
+        self.assertEqual(sorted(names(branch.us_node for branch
+                                      in joined.us_branches)),
+                         ['R1U', 'R2U'])
+        self.assertEqual(names(branch.ds_node for branch
+                               in joined.ds_branches), ['R0D'])
+
+    def test_junction_after_reaches(self):
+        self.assert_joined(self.load(SMALL_DAT))
+
+    def test_reach_components(self):
+        net = self.load(SMALL_DAT)
+        branch = net.find_branch('R1U')
+        sequence = net.component_sequence(branch)
+        self.assertEqual(names(sequence), ['R1U', 'R1001', 'R1D'])
+        self.assertEqual([component.chainage for component in sequence],
+                         [0.0, 196.9, 340.0])
+        self.assertEqual([len(component.units) for component in sequence],
+                         [1, 1, 1])
+
+    def test_junction_before_reaches(self):
+        text = SMALL_DAT.replace(JUNCTION, '')
+        text = text.replace('RIVER\n', JUNCTION + 'RIVER\n', 1)
+        self.assert_joined(self.load(text))
+
+if __name__ == '__main__':
+    unittest.main()